@@ -1,19 +1,38 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
 from streamlit_option_menu import option_menu
-import pickle
 import sklearn
 import pandas as pd
 import numpy as np
 from PIL import Image
 import requests
 
+from model_registry import FEATURE_COLUMNS, ModelRegistry
+
 
-CatBoost = pickle.load(open('cat_base_model.pkl', 'rb'))
 st.set_page_config(page_title="RETIREMENT INCOME PREDICTOR", page_icon=":tada:", layout="wide")
 
+#-------------CACHING ACROSS RERUNS-------------
+# Streamlit runs this whole file again on every widget change, so anything
+# slow to load is cached once per process (older Streamlit calls these
+# experimental_singleton and experimental_memo)
+cache_resource = getattr(st, "cache_resource", None) or st.experimental_singleton
+cache_data = getattr(st, "cache_data", None) or st.experimental_memo
+
+@cache_resource
+def get_registry():
+    # Models are unpickled the first time they are selected, then kept
+    return ModelRegistry()
+
+@cache_resource
+def load_image(path):
+    image = Image.open(path)
+    image.load()
+    return image
+
 
 #-------------CREATING THE LOTTIE FUNCTION-------------
+@cache_data
 def load_lottieurl(url):
     r = requests.get(url)
     if r.status_code != 200:
@@ -21,9 +40,13 @@ def load_lottieurl(url):
     return r.json()
 
 #--------------USE LOCAL CSS TO STRUCTURE CONTACT US FORM-----------------
-def local_css(file_name):
+@cache_data
+def read_text(file_name):
     with open(file_name) as f:
-        st.markdown(f"<style>{f.read()}<style>", unsafe_allow_html=True)       
+        return f.read()
+
+def local_css(file_name):
+    st.markdown(f"<style>{read_text(file_name)}<style>", unsafe_allow_html=True)
 local_css("style/style.css")
 
 #--------------LOAD ASSESTS FOR THE LOTTIE IMAGES------------------
@@ -32,7 +55,7 @@ lottie_coding2 = load_lottieurl("https://assets5.lottiefiles.com/packages/lf20_k
 lottie_coding3 = load_lottieurl("https://assets9.lottiefiles.com/packages/lf20_ANc3UcnG19.json")
 
 #-------------INSERTING THE COMPANY HEADER IMAGE-----------
-image = Image.open('exploreai.png')
+image = load_image('exploreai.png')
 st.image(image)
 st.subheader("Impact, at scale")
 
@@ -157,7 +180,7 @@ if selected == "Home":
    }
         
         
-        info_data = pd.DataFrame(user_info_data, index=[0])
+        info_data = pd.DataFrame(user_info_data, index=[0])[FEATURE_COLUMNS]
         return info_data
         
     individual_data = user_info()
@@ -166,7 +189,13 @@ if selected == "Home":
 
 
 
-    income = CatBoost.predict(individual_data)
+    # The selected model comes warm from the shared registry
+    try:
+        model = get_registry().get(regressor_name)
+    except FileNotFoundError as err:
+        st.error(str(err))
+        st.stop()
+    income = model.predict(individual_data)
     st.header('TARGET MONTHLY INCOME')
     st.write(
         """
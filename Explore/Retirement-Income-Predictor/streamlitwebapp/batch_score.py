@@ -0,0 +1,144 @@
+import argparse
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import pandas as pd
+
+from model_registry import FEATURE_COLUMNS, MODEL_FILES, ModelRegistry
+
+# Set in each worker process by _init_worker
+_model = None
+
+
+def _init_worker(name, directory):
+    # Each worker unpickles the model once, not once per chunk
+    global _model
+    _model = ModelRegistry(directory).get(name)
+
+
+def _predict(features):
+    return _model.predict(features)
+
+
+def read_chunks(path, chunk_rows):
+    """Yield DataFrames of up to chunk_rows rows from a CSV or Parquet file."""
+    if path.endswith('.parquet'):
+        # pyarrow is only needed for Parquet input
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def validate(chunk):
+    """Check a chunk has every model column and that they are numeric.
+
+    Returns the feature columns in the order the model was trained on.
+    Other columns, such as the row index in X_test.csv, are ignored.
+    """
+    missing = [column for column in FEATURE_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    features = chunk[FEATURE_COLUMNS]
+    wrong = [column for column, dtype in features.dtypes.items() if not pd.api.types.is_numeric_dtype(dtype)]
+    if wrong:
+        raise ValueError(f"non-numeric columns: {', '.join(wrong)}")
+    return features
+
+
+class PredictionWriter:
+    """Append (id, prediction) rows to a CSV or Parquet file chunk by chunk."""
+
+    def __init__(self, path, id_name):
+        self.path = path
+        self.id_name = id_name
+        self.parquet = path.endswith('.parquet')
+        self.writer = None
+        self.file = None if self.parquet else open(path, 'w', newline='')
+
+    def write(self, ids, predictions):
+        frame = pd.DataFrame({self.id_name: ids, 'prediction': predictions})
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            frame.to_csv(self.file, header=self.file.tell() == 0, index=False)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        if self.file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def split(chunk, id_column, offset):
+    # Row ids come from id_column, the first non-feature column, or the row number
+    if id_column is None and chunk.columns[0] not in FEATURE_COLUMNS:
+        id_column = chunk.columns[0]
+    ids = chunk[id_column].to_numpy() if id_column else range(offset, offset + len(chunk))
+    return ids, validate(chunk)
+
+
+def score_file(path, output, model_name='CatBoost', chunk_rows=100_000, workers=0, id_column=None,
+               directory=None):
+    """Score every row of path with one model and stream the predictions to output.
+
+    Chunks of chunk_rows rows are validated and predicted in one call each.
+    With workers set, chunks are predicted on a process pool. At most two
+    chunks per worker are in flight, so memory stays bounded, and output
+    keeps the input order. Returns the number of rows scored.
+    """
+    chunks = read_chunks(path, chunk_rows)
+    rows = 0
+    id_name = id_column or 'id'
+    with PredictionWriter(output, id_name) as writer:
+        if not workers:
+            model = ModelRegistry(directory).get(model_name)
+            for chunk in chunks:
+                ids, features = split(chunk, id_column, rows)
+                writer.write(ids, model.predict(features))
+                rows += len(chunk)
+            return rows
+
+        with Pool(workers, _init_worker, (model_name, directory)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                ids, features = split(chunk, id_column, rows)
+                pending.append((ids, pool.apply_async(_predict, (features,))))
+                rows += len(chunk)
+                if len(pending) >= 2 * workers:
+                    ids, result = pending.popleft()
+                    writer.write(ids, result.get())
+            while pending:
+                ids, result = pending.popleft()
+                writer.write(ids, result.get())
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of clients with a retirement income model')
+    parser.add_argument('input')
+    parser.add_argument('output', help='.csv or .parquet file for the predictions')
+    parser.add_argument('--model', choices=list(MODEL_FILES), default='CatBoost')
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0 predicts in this process)')
+    parser.add_argument('--id-column', default=None,
+                        help='column copied to the output with each prediction (default: first non-model column)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = score_file(args.input, args.output, args.model, args.chunk_rows, args.workers, args.id_column)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows with {args.model} in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
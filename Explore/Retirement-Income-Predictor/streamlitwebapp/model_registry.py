@@ -0,0 +1,93 @@
+import os
+import pickle
+import threading
+
+# Model input columns, in the order user_info() in app.py builds them
+FEATURE_COLUMNS = [
+    'Unnamed_0',
+    'GENDER',
+    'RETIREMENT_AGE',
+    'RETIREMENT_FUND_VALUE',
+    'DEPT_VALUE',
+    'CURRENT_NET_MONTHLY_INCOME',
+    'SPARE_CASH_VALUE',
+    'FINANCIALLY_SUPPORT_PARTNER',
+    'FINANCIALLY_SUPPORT_CHILDREN',
+    'YEARS_SUPPORTING_CHILD',
+    'CHILD_MONTHLY_SUPPORTING_VALUE',
+    'YEARS_SUPPORTING_SOMEONE_ELSE',
+    'OTHER_MONTHLY_SUPPORTING_VALUE',
+    'HAS_EMERGENCY_SAVINGS',
+    'CRITICAL_ILLNESS',
+    'ONGOING_COACHING_FEE',
+    'CONFIDENCE_LEVEL',
+    'INITIAL_PLANNER_FEE_INCL_VAT_UT',
+    'INITIAL_PLANNER_FEE_INCL_VAT_LA_AND_LAP',
+    'ONGOING_PLANNER_FEE_INCL_VAT_UT',
+    'ONGOING_PLANNER_FEE_INCL_VAT_LA_AND_LAP',
+    'SPOUSE_GENDER',
+    'SPOUSE_RETIREMENT_AGE',
+    'SPOUSE_DATE_OF_BIRTH',
+    'PERCENTAGE_SUCCESS',
+    'SA_EQUITY_UNIT_TRUST',
+    'SA_BOND_UNIT_TRUST',
+    'SA_CASH_UNIT_TRUST',
+    'INTERNATIONAL_EQUITY_UNIT_TRUST',
+    'INTERNATIONAL_BOND_UNIT_TRUST',
+    'INTERNATIONAL_CASH_UNIT_TRUST',
+    'SA_EQUITY_LAP',
+    'SA_BOND_LAP',
+    'SA_CASH_LAP',
+    'INTERNATIONAL_EQUITY_LAP',
+    'INTERNATIONAL_BOND_LAP',
+    'INTERNATIONAL_CASH_LAP',
+    'LAP_EAC_PA_INCL_VAT',
+    'LA_EAC_PA_INCL_VAT',
+    'UNIT_TRUST_EAC_PA_INCL_VAT',
+]
+
+# Pickled model files for each name in the SELECT MODEL box, first match wins
+MODEL_FILES = {
+    "CatBoost": ["cat_base_model.pkl"],
+    "XGBoost": ["xgb_model.pkl", "xgb.sav"],
+    "Light GBM": ["lgb_model.pkl", "lgb.sav"],
+}
+
+
+class ModelRegistry:
+    """Load each model the first time it is asked for, then keep it.
+
+    One registry is shared by every Streamlit session (see get_registry in
+    app.py), so a rerun never unpickles a model again.
+    """
+
+    def __init__(self, directory=None, files=None):
+        self.directory = directory or os.path.dirname(os.path.abspath(__file__))
+        self.files = files or MODEL_FILES
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def path(self, name):
+        for filename in self.files[name]:
+            path = os.path.join(self.directory, filename)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"no model file for {name} (looked for {', '.join(self.files[name])})")
+
+    def get(self, name):
+        with self.lock:
+            if name not in self.models:
+                with open(self.path(name), 'rb') as f:
+                    self.models[name] = pickle.load(f)
+            return self.models[name]
+
+    def available(self):
+        # Names whose model file is present, without loading them
+        names = []
+        for name in self.files:
+            try:
+                self.path(name)
+                names.append(name)
+            except FileNotFoundError:
+                pass
+        return names
@@ -0,0 +1,135 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+
+def collect_images(source, pattern='*'):
+    # Accept a directory, a glob pattern, an explicit list of files or a
+    # dict mapping each input file to its output file name
+    if isinstance(source, (list, tuple, dict)):
+        return list(source)
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, pattern)))
+    return sorted(glob.glob(source))
+
+
+def output_path_for(input_path, output_dir, prefix='', suffix='', ext=None):
+    name, original_ext = os.path.splitext(os.path.basename(input_path))
+    return os.path.join(output_dir, f'{prefix}{name}{suffix}{ext or original_ext}')
+
+
+def resize_image(input_path, output_path, size, resample=Image.LANCZOS):
+    """Resize a single image and return a dict with its timing."""
+    start = time.perf_counter()
+    with Image.open(input_path) as img:
+        source_size = img.size
+        # JPEG can decode straight to a smaller scale (1/2, 1/4, 1/8), which
+        # skips most of the decode work for big sources
+        if img.format == 'JPEG':
+            img.draft(img.mode, size)
+        # Shrink by an integer factor first so LANCZOS only has to cover the
+        # last (at most 2x) step
+        factor = min(img.width // size[0], img.height // size[1]) // 2
+        if factor > 1 and img.mode not in ('1', 'P'):
+            img = img.reduce(factor)
+        resized_img = img.resize(size, resample=resample)
+        resized_img.save(output_path)
+    elapsed = time.perf_counter() - start
+    return {
+        'input': input_path,
+        'output': output_path,
+        'source_size': source_size,
+        'megapixels': source_size[0] * source_size[1] / 1e6,
+        'seconds': elapsed,
+    }
+
+
+def _resize_job(job):
+    return resize_image(*job)
+
+
+def resize_batch(source, output_dir, size, pattern='*', prefix='', suffix='',
+                 ext=None, workers=None, resample=Image.LANCZOS, verbose=True, cache=None):
+    """Resize every image in source into output_dir using a process pool.
+
+    If a DerivativeCache is given, unchanged inputs are copied from it
+    instead of being resized again.
+
+    Returns a list of per-image results followed by an aggregate summary.
+    """
+    inputs = collect_images(source, pattern)
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = []
+    jobs, cache_keys = [], {}
+    for path in inputs:
+        if isinstance(source, dict):
+            output_path = os.path.join(output_dir, source[path])
+        else:
+            output_path = output_path_for(path, output_dir, prefix, suffix, ext)
+        if cache is not None:
+            key = cache.key(path, 'resize', {'size': size, 'resample': resample},
+                            os.path.splitext(output_path)[1])
+            if cache.fetch(key, output_path):
+                results.append({'input': path, 'output': output_path, 'cached': True,
+                                'megapixels': 0.0, 'seconds': 0.0})
+                continue
+            cache_keys[output_path] = key
+        jobs.append((path, output_path, size, resample))
+
+    executor = None
+    if workers == 1 or len(jobs) <= 1:
+        completed = map(_resize_job, jobs)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        completed = executor.map(_resize_job, jobs, chunksize=max(1, len(jobs) // 64))
+    try:
+        for result in completed:
+            results.append(result)
+            if cache is not None:
+                cache.store(cache_keys[result['output']], result['output'])
+            if verbose:
+                print(f"{result['input']} -> {result['output']} "
+                      f"({result['megapixels']:.1f} MP in {result['seconds'] * 1000:.0f} ms)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'images': len(results),
+        'seconds': elapsed,
+        'images_per_second': len(results) / elapsed if elapsed else 0.0,
+        'megapixels_per_second': sum(r['megapixels'] for r in results) / elapsed if elapsed else 0.0,
+    }
+    if verbose:
+        print(f"Resized {summary['images']} images in {elapsed:.2f}s "
+              f"({summary['images_per_second']:.1f} img/s, "
+              f"{summary['megapixels_per_second']:.1f} MP/s)")
+        if cache is not None:
+            print(cache.report())
+    return results, summary
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Resize a batch of images in parallel')
+    parser.add_argument('source', help='directory or glob pattern of input images')
+    parser.add_argument('output_dir')
+    parser.add_argument('width', type=int)
+    parser.add_argument('height', type=int)
+    parser.add_argument('--pattern', default='*')
+    parser.add_argument('--prefix', default='')
+    parser.add_argument('--suffix', default='')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    from derivative_cache import DerivativeCache
+    resize_batch(args.source, args.output_dir, (args.width, args.height),
+                 pattern=args.pattern, prefix=args.prefix, suffix=args.suffix,
+                 workers=args.workers, cache=None if args.no_cache else DerivativeCache())
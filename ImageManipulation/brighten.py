@@ -1,12 +1,11 @@
-from PIL import Image, ImageEnhance
+from derivative_cache import DerivativeCache
+from pipeline import Pipeline
 
-# Open the original image
-with Image.open('resized_wallpaper.png') as img:
-    # Create a brightness enhancer object
-    enhancer = ImageEnhance.Brightness(img)
-    
-    # Increase the brightness by a factor of 1.5
-    brighter_img = enhancer.enhance(2.5)
-    
-    # Save the brighter image
-    brighter_img.save('brighter_wallpaper.png')
+# Resize the original image to 1200px by 148px and increase the brightness
+# by a factor of 2.5 in one pass, without writing resized_wallpaper.png first
+pipeline = Pipeline().resize((1200, 148)).brightness(2.5)
+
+# Save the brighter image
+cache = DerivativeCache()
+pipeline.run('wallpaper2.png', 'brighter_wallpaper.png', cache=cache)
+print(cache.report())
@@ -1,15 +1,14 @@
-from PIL import Image
+from derivative_cache import DerivativeCache
+from pipeline import Pipeline
 
-# Open the original image
-with Image.open('wallpaper1.jpg') as img:
-    # Set the region to crop
-    left = 0
-    top = 100
-    right = 800
-    bottom = 400
-    
-    # Crop the image
-    cropped_img = img.crop((left, top, right, bottom))
-    
-    # Save the cropped image
-    cropped_img.save('cropped_image.jpg')
\ No newline at end of file
+# Set the region to crop
+left = 0
+top = 100
+right = 800
+bottom = 400
+
+# Crop the image and save it in a single decode/encode pass, reusing the
+# previous result if neither the image nor the region changed
+cache = DerivativeCache()
+Pipeline().crop((left, top, right, bottom)).run('wallpaper1.jpg', 'cropped_image.jpg', cache=cache)
+print(cache.report())
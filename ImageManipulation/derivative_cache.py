@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+
+class DerivativeCache:
+    """On-disk cache of derived images keyed on source content and parameters.
+
+    Entries are whole encoded output files. A running byte total is kept
+    in memory (the directory is only walked on startup), and once it goes
+    over max_bytes the least recently used entries (by mtime, which is
+    bumped on every hit) are evicted until the cache is back under 90% of
+    max_bytes, so a batch of stores does not walk the cache every time.
+    An output too big to fit under that 90% mark is not cached at all,
+    rather than flushing every other entry to make room for it.
+
+    Example:
+        cache = DerivativeCache()
+        key = cache.key('wallpaper2.png', 'resize', {'size': (1200, 148)}, '.png')
+        if not cache.fetch(key, 'resized_wallpaper.png'):
+            ...  # produce resized_wallpaper.png
+            cache.store(key, 'resized_wallpaper.png')
+    """
+
+    def __init__(self, cache_dir='.derivative_cache', max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'evictions': 0}
+        self._hashes = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._sizes = {path: size for _, size, path in self._scan()}
+        self._total = sum(self._sizes.values())
+
+    def file_hash(self, path):
+        # Hash each file once per (path, size, mtime) for the life of the cache
+        info = os.stat(path)
+        memo_key = (os.path.abspath(path), info.st_size, info.st_mtime_ns)
+        if memo_key not in self._hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            self._hashes[memo_key] = digest.hexdigest()
+        return self._hashes[memo_key]
+
+    def key(self, source_path, operation, params, ext):
+        description = json.dumps([operation, params, ext.lower()], sort_keys=True, default=str)
+        digest = hashlib.sha256(self.file_hash(source_path).encode())
+        digest.update(description.encode())
+        return digest.hexdigest() + ext.lower()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def fetch(self, key, output_path):
+        """Copy a cached derivative to output_path. Returns False on a miss."""
+        entry = self._entry_path(key)
+        try:
+            shutil.copyfile(entry, output_path)
+            os.utime(entry)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats['misses'] += 1
+            return False
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['bytes_saved'] += os.path.getsize(output_path)
+        return True
+
+    def store(self, key, output_path):
+        if os.path.getsize(output_path) > self.max_bytes * 0.9:
+            return False
+        entry = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        temporary = f'{entry}.{os.getpid()}.{threading.get_ident()}.tmp'
+        shutil.copyfile(output_path, temporary)
+        size = os.path.getsize(temporary)
+        os.replace(temporary, entry)
+        with self._lock:
+            self._total += size - self._sizes.get(entry, 0)
+            self._sizes[entry] = size
+            if self._total > self.max_bytes:
+                self._evict()
+        return True
+
+    def _scan(self):
+        # (mtime, size, path) of every entry; files removed meanwhile are skipped
+        entries = []
+        for folder, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+        return entries
+
+    def _evict(self):
+        # Called with self._lock held. The walk also picks up entries other
+        # processes sharing the directory have added or removed.
+        entries = self._scan()
+        self._sizes = {path: size for _, size, path in entries}
+        self._total = sum(self._sizes.values())
+        target = self.max_bytes * 0.9
+        for _, _, path in sorted(entries):
+            if self._total <= target:
+                break
+            self._total -= self._sizes.pop(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already removed by another process
+                continue
+            self.stats['evictions'] += 1
+
+    def evict(self):
+        with self._lock:
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def cached(self, source_path, output_path, operation, params, produce):
+        """Fill output_path from the cache, or run produce() and cache the result."""
+        key = self.key(source_path, operation, params, os.path.splitext(output_path)[1])
+        if self.fetch(key, output_path):
+            return True
+        produce()
+        self.store(key, output_path)
+        return False
+
+    def report(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / lookups * 100 if lookups else 0.0
+        return (f"Cache: {self.stats['hits']} hits, {self.stats['misses']} misses "
+                f"({hit_rate:.0f}% hit rate), {self.stats['bytes_saved'] / 1e6:.1f} MB served "
+                f"from cache, {self.stats['evictions']} evictions")
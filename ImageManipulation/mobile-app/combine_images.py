@@ -1,24 +1,20 @@
-from PIL import Image
+import os
+import sys
 
-def join_images_horizontally(image_paths):
-    images = [Image.open(img_path) for img_path in image_paths]
-    widths, heights = zip(*(i.size for i in images))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mosaic import build_mosaic
 
-    total_width = sum(widths)
-    max_height = max(heights)
 
-    new_image = Image.new('RGB', (total_width, max_height))
+def join_images_horizontally(image_paths, output_path=None):
+    # A single-row mosaic, aligned to the top like the images it is built from
+    return build_mosaic(image_paths, output_path)
 
-    x_offset = 0
-    for image in images:
-        new_image.paste(image, (x_offset, 0))
-        x_offset += image.width
-
-    return new_image
 
 # Example usage:
 portrait_image_paths = ["7.png", "8.png", "9.png", "6.png"]
-result_image = join_images_horizontally(portrait_image_paths)
-result_image.save("landscape_image1.png")
+join_images_horizontally(portrait_image_paths, "landscape_image1.png")
+
+# A 3-column contact sheet of all screenshots, streamed straight to disk:
+# build_mosaic([f"{i}.png" for i in range(1, 10)], "contact_sheet.ppm", columns=3)
 
-print("Code completed")
\ No newline at end of file
+print("Code completed")
@@ -1,12 +1,13 @@
-from PIL import Image
+import os
+import sys
 
-# Open the original image
-for i in range(1,10):
-    print(i)    
-    with Image.open(f'{i}.png') as img:
-        # Resize the image to 1200px by 148px using the ANTIALIAS filter
-        resized_img = img.resize((1000, 2200), resample=Image.LANCZOS)    
-        # Save the resized image
-        resized_img.save(f'resized_{i}.png')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from batch_resize import resize_batch
+from derivative_cache import DerivativeCache
 
-print("Code completed!")
+if __name__ == '__main__':
+    # Resize the screenshots to 1000px by 2200px using the LANCZOS filter
+    images = [f'{i}.png' for i in range(1, 10)]
+    resize_batch(images, '.', (1000, 2200), prefix='resized_', cache=DerivativeCache())
+
+    print("Code completed!")
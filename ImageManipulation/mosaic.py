@@ -0,0 +1,94 @@
+import os
+
+from PIL import Image
+
+
+def read_sizes(image_paths):
+    # Image.open only parses the header, so this pass decodes no pixels
+    sizes = []
+    for path in image_paths:
+        with Image.open(path) as img:
+            sizes.append(img.size)
+    return sizes
+
+
+def grid_layout(sizes, columns):
+    """Work out where every image goes in a grid with the given column count.
+
+    Each column is as wide as its widest image and each row as tall as its
+    tallest image. Returns the canvas size, the row heights and one
+    (x, y, row) placement per image.
+    """
+    rows = (len(sizes) + columns - 1) // columns
+    column_widths = [0] * columns
+    row_heights = [0] * rows
+    for i, (width, height) in enumerate(sizes):
+        column_widths[i % columns] = max(column_widths[i % columns], width)
+        row_heights[i // columns] = max(row_heights[i // columns], height)
+
+    placements = []
+    for i in range(len(sizes)):
+        row, column = divmod(i, columns)
+        placements.append((sum(column_widths[:column]), sum(row_heights[:row]), row))
+    return (sum(column_widths), sum(row_heights)), row_heights, placements
+
+
+def _rows(image_paths, placements):
+    # Group (path, x) by grid row, in one pass over the images
+    rows = {}
+    for path, (x, _, row) in zip(image_paths, placements):
+        rows.setdefault(row, []).append((path, x))
+    return rows
+
+
+def _render_strip(images, top, bottom, canvas_width, mode, background):
+    # Scanlines top..bottom of one grid row, cropping each image to just those lines
+    strip = Image.new(mode, (canvas_width, bottom - top), background)
+    for path, x in images:
+        with Image.open(path) as img:
+            if img.height <= top:
+                continue
+            if top or img.height > bottom:
+                img = img.crop((0, top, img.width, min(bottom, img.height)))
+            strip.paste(img.convert(mode), (x, 0))
+    return strip
+
+
+def build_mosaic(image_paths, output_path=None, columns=None, mode='RGB', background=0,
+                 strip_bytes=64 * 1024 * 1024):
+    """Join images into a grid, decoding one image at a time.
+
+    columns defaults to a single row. When output_path ends in .ppm the
+    mosaic is streamed to disk in scanline strips of at most strip_bytes,
+    so the full canvas is never held in memory and None is returned. A grid
+    row that fits in one strip decodes each of its images once; taller rows
+    decode them again for every strip. Otherwise each image is pasted
+    straight into the canvas, which is returned (and saved if output_path
+    is given).
+    """
+    columns = columns or len(image_paths)
+    sizes = read_sizes(image_paths)
+    canvas_size, row_heights, placements = grid_layout(sizes, columns)
+
+    if output_path and os.path.splitext(output_path)[1].lower() == '.ppm':
+        if mode != 'RGB':
+            raise ValueError("streamed .ppm output only supports RGB")
+        strip_rows = max(1, strip_bytes // (canvas_size[0] * 3 or 1))
+        rows = _rows(image_paths, placements)
+        with open(output_path, 'wb') as f:
+            f.write(b'P6\n%d %d\n255\n' % canvas_size)
+            for row, row_height in enumerate(row_heights):
+                for top in range(0, row_height, strip_rows):
+                    bottom = min(top + strip_rows, row_height)
+                    strip = _render_strip(rows[row], top, bottom, canvas_size[0], mode, background)
+                    f.write(strip.tobytes())
+        return None
+
+    canvas = Image.new(mode, canvas_size, background)
+    for path, (x, y, _) in zip(image_paths, placements):
+        # Decode, paste and release one image at a time
+        with Image.open(path) as img:
+            canvas.paste(img.convert(mode), (x, y))
+    if output_path:
+        canvas.save(output_path)
+    return canvas
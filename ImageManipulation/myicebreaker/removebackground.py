@@ -1,11 +1,111 @@
-from rembg import remove
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rembg import new_session, remove
 from PIL import Image
 
-images = ['sticker01.png', 'sticker02.png', 'sticker03.png', 'sticker04.png', 'sticker05.png', 'sticker06.png', 'sticker07.png', 'sticker08.png', 'sticker09.png', 'sticker10.png', 
+images = ['sticker01.png', 'sticker02.png', 'sticker03.png', 'sticker04.png', 'sticker05.png', 'sticker06.png', 'sticker07.png', 'sticker08.png', 'sticker09.png', 'sticker10.png',
           'sticker11.png', 'sticker12.png', 'sticker13.png'] #, 'sticker14.png', 'sticker15.png', 'sticker16.png', 'sticker17.png', 'sticker18.png', 'sticker19.png']
-input_path = 'sticker01.png'
-outputpath = 'sticker01_output.png'
 
-input = Image.open(input_path)
-output = remove(input)
-output.save(outputpath)
\ No newline at end of file
+MANIFEST_NAME = '.rembg_manifest.json'
+
+# One warm session per worker process, created by the pool initializer
+_session = None
+
+
+def _init_worker(model_name):
+    global _session
+    _session = new_session(model_name)
+
+
+def _remove_background(job):
+    input_path, output_path = job
+    start = time.perf_counter()
+    with Image.open(input_path) as input:
+        output = remove(input, session=_session)
+    output.save(output_path)
+    return input_path, time.perf_counter() - start
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def output_path_for(input_path, output_dir, input_root=None):
+    # Under input_root, keep the image's folder so same-named files do not collide
+    name = os.path.relpath(input_path, input_root) if input_root else os.path.basename(input_path)
+    name, _ = os.path.splitext(name)
+    return os.path.join(output_dir, f'{name}_output.png')
+
+
+def remove_backgrounds(input_paths, output_dir='.', model_name='u2net', workers=2, force=False,
+                       input_root=None):
+    """Remove the background of every input image.
+
+    Each worker process keeps one rembg session warm for all of its images,
+    and every session holds its own copy of the model, so keep workers small.
+    Images whose content hash matches the last run (and whose output still
+    exists) are skipped. With input_root set, outputs mirror the folders of
+    the inputs under it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    jobs, hashes = [], {}
+    for input_path in input_paths:
+        output_path = output_path_for(input_path, output_dir, input_root)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        digest = file_hash(input_path)
+        entry = manifest.get(os.path.abspath(input_path))
+        up_to_date = (entry and entry['sha256'] == digest and entry['model'] == model_name
+                      and os.path.exists(output_path))
+        if up_to_date and not force:
+            print("Up to date:", input_path)
+            continue
+        hashes[input_path] = digest
+        jobs.append((input_path, output_path))
+
+    start = time.perf_counter()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(jobs))), initializer=_init_worker,
+                                 initargs=(model_name,)) as executor:
+            for input_path, seconds in executor.map(_remove_background, jobs):
+                print(f"Processed {input_path} in {seconds:.2f}s")
+                manifest[os.path.abspath(input_path)] = {'sha256': hashes[input_path],
+                                                         'model': model_name}
+                # Save after every image so an interrupted run can resume
+                with open(manifest_path, 'w') as f:
+                    json.dump(manifest, f, indent=2)
+
+    print(f"Removed {len(jobs)} backgrounds in {time.perf_counter() - start:.2f}s, "
+          f"skipped {len(input_paths) - len(jobs)} up-to-date images")
+    return [output_path for _, output_path in jobs]
+
+
+if __name__ == '__main__':
+    # Pass a directory to process every .png under it instead of the images list.
+    # Its outputs go to <directory>_output (or the third argument), in the same folders.
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    if workers < 1:
+        sys.exit("workers must be at least 1")
+    if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]):
+        input_root = os.path.abspath(sys.argv[1])
+        output_dir = sys.argv[3] if len(sys.argv) > 3 else input_root + '_output'
+        input_paths = sorted(p for p in glob.glob(os.path.join(input_root, '**', '*.png'), recursive=True)
+                             if not p.endswith('_output.png'))
+        remove_backgrounds(input_paths, output_dir, workers=workers, input_root=input_root)
+    else:
+        remove_backgrounds(images, workers=workers)
@@ -0,0 +1,147 @@
+import os
+
+from PIL import Image, ImageEnhance
+from watermark import paste_watermark
+
+
+class Pipeline:
+    """A chain of crop/brightness/resize/watermark operations on one image.
+
+    The chain is executed with a single decode of the source and a single
+    encode of the result. Crops and resizes are folded into one resample of
+    the source region, done in horizontal strips. The source is decoded in
+    full (big JPEGs at a reduced scale when the output is smaller), and the
+    output is built in memory, except for a .ppm output_path without
+    watermarks: then each strip is written straight to the file, as
+    mosaic.build_mosaic does, and the output canvas is never allocated.
+
+    Example:
+        Pipeline().resize((1200, 148)).brightness(2.5).run('wallpaper2.png', 'out.png')
+    """
+
+    def __init__(self, strip_height=512, resample=Image.LANCZOS):
+        self.strip_height = strip_height
+        self.resample = resample
+        self.operations = []
+
+    def crop(self, box):
+        self.operations.append(('crop', tuple(box)))
+        return self
+
+    def brightness(self, factor):
+        self.operations.append(('brightness', factor))
+        return self
+
+    def resize(self, size):
+        self.operations.append(('resize', tuple(size)))
+        return self
+
+    def watermark(self, watermark_path, size=(50, 50), transparency=100):
+        self.operations.append(('watermark', (watermark_path, tuple(size), transparency)))
+        return self
+
+    def plan(self, source_size):
+        # Fold every crop/resize into a single (source box, output size) pair
+        # and collect the per-pixel and compositing steps
+        x0, y0, x1, y1 = 0.0, 0.0, float(source_size[0]), float(source_size[1])
+        width, height = source_size
+        pixel_ops = []
+        overlays = []
+        for name, value in self.operations:
+            if name in ('crop', 'resize') and overlays:
+                raise ValueError("watermark must come after every crop and resize")
+            if name == 'crop':
+                left, top, right, bottom = value
+                # Image.crop would pad a box like this, but a resample cannot
+                if not (0 <= left < right <= width and 0 <= top < bottom <= height):
+                    raise ValueError(f"crop box {value} does not fit inside the {width}x{height} image")
+                scale_x = (x1 - x0) / width
+                scale_y = (y1 - y0) / height
+                x0, y0, x1, y1 = (x0 + left * scale_x, y0 + top * scale_y,
+                                  x0 + right * scale_x, y0 + bottom * scale_y)
+                width, height = right - left, bottom - top
+            elif name == 'resize':
+                width, height = value
+            elif name == 'brightness':
+                pixel_ops.append(value)
+            elif name == 'watermark':
+                overlays.append(value)
+        return (x0, y0, x1, y1), (width, height), pixel_ops, overlays
+
+    def _render_strip(self, img, box, output_size, top, bottom):
+        x0, y0, x1, y1 = box
+        scale_y = (y1 - y0) / output_size[1]
+        strip_box = (x0, y0 + top * scale_y, x1, y0 + bottom * scale_y)
+        rows = bottom - top
+        is_plain_crop = (x1 - x0 == output_size[0] and scale_y == 1
+                         and all(float(v).is_integer() for v in strip_box))
+        if is_plain_crop:
+            return img.crop(tuple(int(v) for v in strip_box))
+        # The resample kernel reads pixels outside the strip box, so strips
+        # join without seams
+        return img.resize((output_size[0], rows), resample=self.resample,
+                          box=strip_box, reducing_gap=3.0)
+
+    def _strips(self, img, box, output_size, pixel_ops):
+        # Output strips from top to bottom, with the per-pixel steps applied
+        for top in range(0, output_size[1], self.strip_height):
+            bottom = min(top + self.strip_height, output_size[1])
+            strip = self._render_strip(img, box, output_size, top, bottom)
+            for factor in pixel_ops:
+                strip = ImageEnhance.Brightness(strip).enhance(factor)
+            yield strip
+
+    def cache_params(self, cache):
+        # Watermarks are identified by content, not by path
+        params = []
+        for name, value in self.operations:
+            if name == 'watermark':
+                value = (cache.file_hash(value[0]),) + value[1:]
+            params.append((name, value))
+        return {'operations': params, 'resample': self.resample}
+
+    def run(self, input_path, output_path, cache=None, **save_options):
+        """Run the chain on input_path and save the result to output_path.
+
+        If a DerivativeCache is given and the same source went through the
+        same chain before, the cached output is copied instead.
+        """
+        if cache is not None:
+            params = dict(self.cache_params(cache), save_options=save_options)
+            cache.cached(input_path, output_path, 'pipeline', params,
+                         lambda: self.run(input_path, output_path, **save_options))
+            with Image.open(output_path) as img:
+                return img.size
+
+        with Image.open(input_path) as img:
+            box, output_size, pixel_ops, overlays = self.plan(img.size)
+            # Big JPEGs can be decoded at 1/2, 1/4 or 1/8 scale when the
+            # output is much smaller than the source
+            if img.format == 'JPEG':
+                requested = (int(img.width * output_size[0] / (box[2] - box[0])),
+                             int(img.height * output_size[1] / (box[3] - box[1])))
+                full_size = img.size
+                img.draft(img.mode, requested)
+                if img.size != full_size:
+                    ratio_x = img.width / full_size[0]
+                    ratio_y = img.height / full_size[1]
+                    box = (box[0] * ratio_x, box[1] * ratio_y, box[2] * ratio_x, box[3] * ratio_y)
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+            if os.path.splitext(output_path)[1].lower() == '.ppm' and not overlays:
+                with open(output_path, 'wb') as f:
+                    f.write(b'P6\n%d %d\n255\n' % output_size)
+                    for strip in self._strips(img, box, output_size, pixel_ops):
+                        f.write(strip.convert('RGB').tobytes())
+                return output_size
+
+            output = Image.new(img.mode, output_size)
+            for top, strip in enumerate(self._strips(img, box, output_size, pixel_ops)):
+                output.paste(strip, (0, top * self.strip_height))
+
+        for watermark_path, size, transparency in overlays:
+            output = paste_watermark(output, watermark_path, size, transparency)
+        output.save(output_path, **save_options)
+        return output.size
+
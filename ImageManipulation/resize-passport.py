@@ -1,8 +1,6 @@
-from PIL import Image
+from batch_resize import resize_batch
+from derivative_cache import DerivativeCache
 
-# Open the original image
-with Image.open('George-image.jpeg') as img:
-    # Resize the image to 1200px by 148px using the ANTIALIAS filter
-    resized_img = img.resize((600, 600), resample=Image.LANCZOS)    
-    # Save the resized image
-    resized_img.save('resized-passport.jpeg')
\ No newline at end of file
+if __name__ == '__main__':
+    # Resize the image to 600px by 600px using the LANCZOS filter
+    resize_batch({'George-image.jpeg': 'resized-passport.jpeg'}, '.', (600, 600), cache=DerivativeCache())
@@ -1,8 +1,6 @@
-from PIL import Image
+from batch_resize import resize_batch
+from derivative_cache import DerivativeCache
 
-# Open the original image
-with Image.open('wallpaper2.png') as img:
-    # Resize the image to 1200px by 148px using the ANTIALIAS filter
-    resized_img = img.resize((1200, 148), resample=Image.LANCZOS)    
-    # Save the resized image
-    resized_img.save('resized_wallpaper.png')
\ No newline at end of file
+if __name__ == '__main__':
+    # Resize the image to 1200px by 148px using the LANCZOS filter
+    resize_batch({'wallpaper2.png': 'resized_wallpaper.png'}, '.', (1200, 148), cache=DerivativeCache())
@@ -0,0 +1,97 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from batch_resize import collect_images, output_path_for
+from PIL import Image
+
+
+@lru_cache(maxsize=None)
+def alpha_table(transparency):
+    # Lookup table that scales an alpha channel to the given percentage
+    return [p * transparency // 100 for p in range(256)]
+
+
+@lru_cache(maxsize=64)
+def _prepared_watermark(watermark_path, modified, size, transparency):
+    with Image.open(watermark_path) as watermark:
+        watermark = watermark.convert('RGBA').resize(size, resample=Image.LANCZOS)
+    if 0 <= transparency <= 100:
+        watermark.putalpha(watermark.getchannel('A').point(alpha_table(transparency)))
+    return watermark
+
+
+def prepare_watermark(watermark_path, size=(50, 50), transparency=100):
+    """Return the resized, alpha-scaled watermark, loading it at most once.
+
+    The file modification time is part of the cache key, so editing the
+    watermark file on disk invalidates the cached variants.
+    """
+    modified = os.path.getmtime(watermark_path)
+    return _prepared_watermark(os.path.abspath(watermark_path), modified, tuple(size), transparency)
+
+
+def paste_watermark(image, watermark_path, size=(50, 50), transparency=100):
+    watermark = prepare_watermark(watermark_path, size, transparency)
+    # Calculate the position for the bottom right corner
+    position = (image.width - watermark.width * 2, image.height - watermark.height * 2)
+    image.paste(watermark, position, watermark)
+    return image
+
+
+def add_watermark(input_image_path, output_image_path, watermark_image_path,
+                  transparency=100, size=(50, 50), cache=None):
+    if cache is not None:
+        params = {'watermark': cache.file_hash(watermark_image_path), 'size': size,
+                  'transparency': transparency}
+        cache.cached(input_image_path, output_image_path, 'watermark', params,
+                     lambda: add_watermark(input_image_path, output_image_path,
+                                           watermark_image_path, transparency, size))
+        return output_image_path
+    with Image.open(input_image_path) as input_image:
+        input_image.load()
+        paste_watermark(input_image, watermark_image_path, size, transparency)
+        input_image.save(output_image_path)
+    return output_image_path
+
+
+def watermark_batch(source, output_dir, watermark_path, transparency=100, size=(50, 50),
+                    pattern='*', prefix='', suffix='', workers=None, verbose=True, cache=None):
+    """Watermark every image in source into output_dir using a thread pool.
+
+    Threads share the prepared watermark cache, and Pillow releases the GIL
+    while decoding, compositing and encoding.
+    """
+    inputs = collect_images(source, pattern)
+    os.makedirs(output_dir, exist_ok=True)
+    # Warm the cache once before fanning out
+    prepare_watermark(watermark_path, size, transparency)
+
+    def job(path):
+        if isinstance(source, dict):
+            output_path = os.path.join(output_dir, source[path])
+        else:
+            output_path = output_path_for(path, output_dir, prefix, suffix)
+        try:
+            return add_watermark(path, output_path, watermark_path, transparency, size, cache), None
+        except Exception as e:
+            return path, e
+
+    start = time.perf_counter()
+    done, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, error in executor.map(job, inputs):
+            if error is None:
+                done.append(path)
+            else:
+                failed.append((path, error))
+                if verbose:
+                    print("Error:", path, error)
+    elapsed = time.perf_counter() - start
+    if verbose:
+        rate = len(done) / elapsed if elapsed else 0.0
+        print(f"Watermarked {len(done)} images in {elapsed:.2f}s ({rate:.1f} img/s), {len(failed)} failed")
+        if cache is not None:
+            print(cache.report())
+    return done, failed
@@ -1,31 +1,29 @@
-from pytube import YouTube
+import os
 
-def download_youtube_video(video_url, output_path):
-    # Set custom user agent
-    YouTube.DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-    yt = YouTube(video_url)
-    print("Streams: ",yt.streams())
-    stream = yt.streams.filter(res="720p").first()
+from download_manager import DownloadManager
+from stream_cache import DownloadIndex, StreamCache, youtube_resolver
+
+def download_youtube_video(video_url, output_path, resolution="720p", cache=None):
+    # Stream metadata comes from the cache when it is fresh, so retries and
+    # quality changes do not fetch and parse the watch page again
+    cache = cache or StreamCache(os.path.join(output_path, "stream_cache.json"))
     try:
-        # Create a YouTube object
-        yt = YouTube(video_url)
-        
-        # Filter streams based on resolution, file extension, etc.
-        print("Streams: ",yt.streams())
-        stream = yt.streams.filter(res="720p").first()
-        # Select the highest quality stream
-        # stream = yt.streams.get_highest_resolution()
-        
-        # Download the video
-        stream.download(output_path)
-        
-        print("Video downloaded successfully!")
-    except Exception as e:
-        print("An error occurred while downloading the video:", str(e))
+        os.makedirs(output_path, exist_ok=True)
+        manager = DownloadManager(output_path, resolve=youtube_resolver(resolution, cache),
+                                  index=DownloadIndex(os.path.join(output_path, "downloads.json")))
 
-video_url = "https://www.youtube.com/watch?v=d4L1Pte7zVc"
-output_path = "/downloads/"
+        # Download the video; one that is already downloaded is not fetched again
+        result = manager.download_all([video_url])[0]
+        if result["error"]:
+            raise RuntimeError(result["error"])
 
-download_youtube_video(video_url, output_path)
+        print("Video downloaded successfully!", result["path"])
+        return result["path"]
+    except Exception as e:
+        print("An error occurred while downloading the video:", str(e))
 
+if __name__ == "__main__":
+    video_url = "https://www.youtube.com/watch?v=d4L1Pte7zVc"
+    output_path = "/downloads/"
 
+    download_youtube_video(video_url, output_path)
@@ -0,0 +1,306 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.error import HTTPError
+from urllib.parse import unquote, urlsplit
+
+from stream_cache import DownloadIndex, StreamCache, youtube_resolver
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+BLOCK_SIZE = 1024 * 1024
+# How much a chunk downloads between saves of the resume state
+SAVE_EVERY = 4 * 1024 * 1024
+
+
+class HostLimiter:
+    """At most per_host requests open to one host at a time, started at
+    least interval seconds apart."""
+
+    def __init__(self, per_host=4, interval=0.0):
+        self.per_host = per_host
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.next_start = {}
+
+    @contextmanager
+    def slot(self, host):
+        with self.lock:
+            semaphore = self.slots.setdefault(host, threading.Semaphore(self.per_host))
+        with semaphore:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_start.get(host, now))
+                self.next_start[host] = start + self.interval
+            time.sleep(start - now)
+            yield
+
+
+class PartialFile:
+    """A download in progress: <path>.part holds the bytes and
+    <path>.part.json records how far each chunk has got, so a download
+    interrupted by a crash carries on from there."""
+
+    def __init__(self, path, url, size, chunk_size):
+        self.path = path
+        self.part = path + '.part'
+        self.state_path = self.part + '.json'
+        self.lock = threading.Lock()
+        self.state = None
+        if os.path.exists(self.state_path) and os.path.exists(self.part):
+            with open(self.state_path) as f:
+                state = json.load(f)
+            # Only resume the same file at the same size
+            if state['url'] == url and state['size'] == size and state['chunk_size'] == chunk_size:
+                self.state = state
+        if self.state is None:
+            starts = range(0, size, chunk_size) if size else [0]
+            self.state = {'url': url, 'size': size, 'chunk_size': chunk_size,
+                          'done': {str(start): 0 for start in starts}}
+            with open(self.part, 'wb') as f:
+                f.truncate(size or 0)
+            self.save()
+
+    def chunks(self):
+        # (start, end, bytes already written) for every chunk not finished yet
+        size, chunk_size = self.state['size'], self.state['chunk_size']
+        for start, done in sorted((int(s), d) for s, d in self.state['done'].items()):
+            end = min(start + chunk_size, size) if size else None
+            if end is None or start + done < end:
+                yield start, end, done
+
+    def progress(self, start, done):
+        with self.lock:
+            self.state['done'][str(start)] = done
+
+    def save(self):
+        with self.lock:
+            with open(self.state_path + '.tmp', 'w') as f:
+                json.dump(self.state, f)
+            os.replace(self.state_path + '.tmp', self.state_path)
+
+    def finish(self):
+        os.replace(self.part, self.path)
+        os.remove(self.state_path)
+
+
+def filename_for(url):
+    # A short hash of the whole URL keeps same-named files from different places apart
+    name, ext = os.path.splitext(unquote(os.path.basename(urlsplit(url).path)))
+    return f"{name or 'download'}-{hashlib.sha256(url.encode()).hexdigest()[:10]}{ext}"
+
+
+class DownloadManager:
+    """Download a queue of URLs into output_dir.
+
+    Up to max_downloads files are fetched at once. Files served with
+    byte-range support are split into chunk_size pieces fetched in parallel
+    by chunk_workers threads shared by all downloads. HostLimiter keeps
+    per_host requests (spaced host_interval seconds apart) open per host.
+    Interrupted downloads resume from their .part file. Files are named
+    after the URL plus a short hash of it, so a finished file is only ever
+    this URL's download.
+
+    resolve(url) may turn a page URL into (media URL, filename, key), e.g.
+    stream_cache.youtube_resolver; by default URLs are downloaded as they
+    are and keyed by URL. With a DownloadIndex, a key that was already
+    downloaded is skipped and identical content is stored once. If resolve
+    has a key(url) method the index is checked with it first, so a finished
+    download is skipped without resolving the URL at all.
+    """
+
+    def __init__(self, output_dir, max_downloads=4, chunk_workers=8, chunk_size=8 * 1024 * 1024,
+                 per_host=4, host_interval=0.0, retries=3, timeout=30, resolve=None, index=None):
+        self.output_dir = output_dir
+        self.max_downloads = max_downloads
+        self.chunk_workers = chunk_workers
+        self.chunk_size = chunk_size
+        self.limiter = HostLimiter(per_host, host_interval)
+        self.retries = retries
+        self.timeout = timeout
+        self.resolve = resolve
+        self.index = index
+        self.lock = threading.Lock()
+        self.locks = {}
+
+    def _open(self, url, start=None, end=None):
+        headers = {'User-Agent': USER_AGENT}
+        if start is not None:
+            headers['Range'] = f'bytes={start}-' + (str(end - 1) if end else '')
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout)
+
+    def probe(self, url):
+        """Return (size, accepts_ranges) by asking for the first byte."""
+        with self.limiter.slot(urlsplit(url).hostname):
+            try:
+                with self._open(url, 0, 1) as response:
+                    content_range = response.headers.get('Content-Range', '')
+                    if response.status == 206 and '/' in content_range:
+                        total = content_range.rsplit('/', 1)[1]
+                        if total != '*':
+                            return int(total), True
+                    length = response.headers.get('Content-Length')
+                    return (int(length) if length else None), False
+            except HTTPError as err:
+                if err.code != 416:
+                    raise
+                # An empty file cannot satisfy a range
+                return 0, False
+
+    def fetch_chunk(self, partial, url, start, end, done):
+        """Write bytes start+done..end of url into the .part file, retrying
+        from wherever an attempt stopped."""
+        ranged = end is not None
+        for attempt in range(self.retries + 1):
+            try:
+                with self.limiter.slot(urlsplit(url).hostname):
+                    with self._open(url, start + done if ranged else None, end) as response, \
+                            open(partial.part, 'r+b') as f:
+                        if ranged and response.status != 206:
+                            raise ValueError(f"server ignored the byte range for {url}")
+                        f.seek(start + done)
+                        saved = done
+                        expected = end - start if ranged else int(response.headers.get('Content-Length') or 0)
+                        for block in iter(lambda: response.read(BLOCK_SIZE), b''):
+                            f.write(block)
+                            done += len(block)
+                            if ranged:
+                                partial.progress(start, done)
+                                if done - saved >= SAVE_EVERY:
+                                    f.flush()
+                                    partial.save()
+                                    saved = done
+                if done < expected:
+                    raise ValueError(f"connection closed {expected - done} bytes early")
+                partial.save()
+                return done
+            except (OSError, ValueError):
+                if attempt == self.retries:
+                    partial.save()
+                    raise
+                if not ranged:
+                    # Without ranges a retry starts the file again
+                    done = 0
+                time.sleep(2 ** attempt)
+
+    def _lock_for(self, name):
+        with self.lock:
+            return self.locks.setdefault(name, threading.Lock())
+
+    def key_for(self, url):
+        # The index key known before resolving, or None if only resolve can tell
+        if not self.resolve:
+            return url
+        key = getattr(self.resolve, 'key', None)
+        return key(url) if key else None
+
+    def download(self, url, filename=None, chunks=None):
+        """Download one URL and return its path. chunks is the executor
+        used for the byte-range pieces.
+
+        A file already at an explicitly given filename that no index entry
+        says belongs to this URL raises FileExistsError rather than being
+        taken as this download.
+        """
+        # Names from filename_for or resolve are unique to the URL or key
+        owned = filename is None
+        key = self.key_for(url)
+        # The same key queued twice is downloaded once; the second waits for it
+        with self._lock_for(('key', key or url)):
+            existing = self.index.lookup(key) if self.index and key else None
+            if existing:
+                return existing
+            if self.resolve:
+                url, filename, resolved_key = self.resolve(url)
+                key = key or resolved_key
+            path = os.path.join(self.output_dir, filename or filename_for(url))
+            # Different keys can still resolve to the same file
+            with self._lock_for(path):
+                existing = self.index.lookup(key) if self.index else None
+                if existing:
+                    return existing
+                finished = os.path.exists(path) and not os.path.exists(path + '.part')
+                if finished and not owned:
+                    raise FileExistsError(f"{path} already exists and is not a download of {url}")
+                if not finished:
+                    self._fetch(url, path, chunks)
+                return self.index.add(key, path) if self.index else path
+
+    def _fetch(self, url, path, chunks):
+        size, ranged = self.probe(url)
+        if not ranged:
+            size = None
+        partial = PartialFile(path, url, size, self.chunk_size if ranged else 0)
+        pieces = list(partial.chunks())
+        if chunks is None or len(pieces) == 1:
+            for piece in pieces:
+                self.fetch_chunk(partial, url, *piece)
+        else:
+            futures = [chunks.submit(self.fetch_chunk, partial, url, *piece) for piece in pieces]
+            for future in futures:
+                future.result()
+        partial.finish()
+
+    def download_all(self, urls):
+        """Download every URL, max_downloads at a time.
+
+        Returns one {'url', 'path', 'bytes', 'seconds', 'error'} dict per
+        URL, in the order they finished. One failed download does not stop
+        the others.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        results = []
+
+        def job(url):
+            start = time.perf_counter()
+            path = self.download(url, chunks=chunk_pool)
+            return {'url': url, 'path': path, 'bytes': os.path.getsize(path),
+                    'seconds': time.perf_counter() - start, 'error': None}
+
+        with ThreadPoolExecutor(self.chunk_workers) as chunk_pool, \
+                ThreadPoolExecutor(self.max_downloads) as file_pool:
+            futures = {file_pool.submit(job, url): url for url in urls}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as err:
+                    results.append({'url': futures[future], 'path': None, 'bytes': 0,
+                                    'seconds': None, 'error': repr(err)})
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Download a list of URLs concurrently, resuming partial files')
+    parser.add_argument('urls', help='file with one URL per line')
+    parser.add_argument('--output', default='downloads')
+    parser.add_argument('--downloads', type=int, default=4, help='files downloaded at once')
+    parser.add_argument('--chunk-workers', type=int, default=8)
+    parser.add_argument('--chunk-mb', type=int, default=8)
+    parser.add_argument('--per-host', type=int, default=4, help='open requests per host')
+    parser.add_argument('--host-interval', type=float, default=0.0, help='seconds between requests to one host')
+    parser.add_argument('--youtube', action='store_true', help='treat the URLs as YouTube pages (needs pytube)')
+    parser.add_argument('--resolution', default='720p')
+    parser.add_argument('--stream-cache', default='stream_cache.json', help='where YouTube stream metadata is cached')
+    args = parser.parse_args()
+
+    with open(args.urls) as f:
+        urls = [line.strip() for line in f if line.strip()]
+    os.makedirs(args.output, exist_ok=True)
+    resolve = youtube_resolver(args.resolution, StreamCache(args.stream_cache)) if args.youtube else None
+    manager = DownloadManager(args.output, args.downloads, args.chunk_workers, args.chunk_mb * 1024 * 1024,
+                              args.per_host, args.host_interval, resolve=resolve,
+                              index=DownloadIndex(os.path.join(args.output, 'downloads.json')))
+    start = time.perf_counter()
+    results = manager.download_all(urls)
+    total = sum(result['bytes'] for result in results)
+    for result in results:
+        print(result['path'] or f"{result['url']} failed: {result['error']}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} downloads, {total / 1e6:.1f} MB in {elapsed:.1f}s "
+          f"({total / 1e6 / elapsed if elapsed else 0:.1f} MB/s)")
@@ -0,0 +1,144 @@
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+
+# Bytes held per input in flight; the pipe blocks when ffmpeg falls behind,
+# so memory stays at about one block per input however big the video is
+BLOCK_SIZE = 1024 * 1024
+
+
+def open_source(source, headers=None):
+    if '://' in source:
+        request = urllib.request.Request(source, headers=headers or {})
+        return urllib.request.urlopen(request, timeout=30)
+    return open(source, 'rb')
+
+
+def feed(source, fd, headers, block_size, counts, index, errors):
+    # Copy one input into its pipe a block at a time
+    try:
+        # The pipe is opened first so it is closed (EOF for ffmpeg) even if the source fails
+        with os.fdopen(fd, 'wb') as pipe, open_source(source, headers) as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                pipe.write(block)
+                counts[index] += len(block)
+    except BrokenPipeError:
+        # ffmpeg stopped reading; its exit status says why
+        pass
+    except Exception as err:
+        errors.append(err)
+
+
+def ffmpeg_command(inputs, output, video_codec, audio_codec, ffmpeg='ffmpeg'):
+    command = [ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y']
+    for source in inputs:
+        command += ['-i', source]
+    if len(inputs) == 2:
+        # Video from the first input, audio from the second
+        command += ['-map', '0:v:0', '-map', '1:a:0']
+    return command + ['-c:v', video_codec, '-c:a', audio_codec, output]
+
+
+def stream_remux(video, audio=None, output='output.mkv', video_codec='copy', audio_codec='copy',
+                 headers=None, block_size=BLOCK_SIZE, ffmpeg='ffmpeg'):
+    """Mux (or transcode) video and audio into output while they download.
+
+    video and audio are URLs or local paths. Each is read on its own thread
+    and written into an anonymous pipe that ffmpeg reads as pipe:<fd>, so
+    nothing is saved before muxing. The default 'copy' codecs only remux;
+    pass e.g. video_codec='libx264' to transcode. Inputs must be streamable
+    through a pipe, which YouTube's WebM and fragmented MP4 formats are.
+
+    Returns {'input_bytes', 'output_bytes', 'seconds', 'mb_per_s'} where
+    mb_per_s is input megabytes processed per second.
+    """
+    sources = [video] + ([audio] if audio else [])
+    pipes = [os.pipe() for _ in sources]
+    command = ffmpeg_command([f'pipe:{read}' for read, _ in pipes], output, video_codec, audio_codec, ffmpeg)
+
+    start = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                   pass_fds=[read for read, _ in pipes])
+    except OSError:
+        for read, write in pipes:
+            os.close(read)
+            os.close(write)
+        raise
+    for read, _ in pipes:
+        os.close(read)
+
+    counts = [0] * len(sources)
+    errors = []
+    feeders = [threading.Thread(target=feed, args=(source, write, headers, block_size, counts, i, errors))
+               for i, (source, (_, write)) in enumerate(zip(sources, pipes))]
+    for feeder in feeders:
+        feeder.start()
+    _, stderr = process.communicate()
+    for feeder in feeders:
+        feeder.join()
+    elapsed = time.perf_counter() - start
+
+    if errors or process.returncode:
+        # A failed download looks like a short file to ffmpeg, so do not keep the output
+        if os.path.exists(output):
+            os.remove(output)
+        if errors:
+            raise errors[0]
+        raise RuntimeError(f"ffmpeg exited with {process.returncode}: {stderr.decode(errors='replace').strip()}")
+    total = sum(counts)
+    return {'input_bytes': total, 'output_bytes': os.path.getsize(output), 'seconds': elapsed,
+            'mb_per_s': total / 1e6 / elapsed if elapsed else 0.0}
+
+
+def download_then_merge(video, audio=None, output='output.mkv', video_codec='copy', audio_codec='copy',
+                        headers=None, ffmpeg='ffmpeg'):
+    """The youtube_dl way, for comparison: save each input to a temporary
+    file, then run ffmpeg over the files."""
+    start = time.perf_counter()
+    total = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        paths = []
+        for i, source in enumerate([video] + ([audio] if audio else [])):
+            path = os.path.join(scratch, f'input{i}')
+            with open_source(source, headers) as f, open(path, 'wb') as copy:
+                shutil.copyfileobj(f, copy, BLOCK_SIZE)
+            total += os.path.getsize(path)
+            paths.append(path)
+        subprocess.run(ffmpeg_command(paths, output, video_codec, audio_codec, ffmpeg),
+                       stdin=subprocess.DEVNULL, check=True)
+    elapsed = time.perf_counter() - start
+    return {'input_bytes': total, 'output_bytes': os.path.getsize(output), 'seconds': elapsed,
+            'mb_per_s': total / 1e6 / elapsed if elapsed else 0.0}
+
+
+def report(name, stats):
+    print(f"{name}: {stats['input_bytes'] / 1e6:.1f} MB in, {stats['output_bytes'] / 1e6:.1f} MB out, "
+          f"{stats['seconds']:.2f}s, {stats['mb_per_s']:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mux a video and audio stream while they download')
+    parser.add_argument('video', help='URL or path of the video (or combined) stream')
+    parser.add_argument('audio', nargs='?', default=None, help='URL or path of a separate audio stream')
+    parser.add_argument('--output', default='output.mkv')
+    parser.add_argument('--video-codec', default='copy')
+    parser.add_argument('--audio-codec', default='copy')
+    parser.add_argument('--block-kb', type=int, default=BLOCK_SIZE // 1024, help='read size per input')
+    parser.add_argument('--compare', action='store_true',
+                        help='also time downloading to temporary files and merging afterwards')
+    args = parser.parse_args()
+
+    report('Streaming', stream_remux(args.video, args.audio, args.output, args.video_codec, args.audio_codec,
+                                     block_size=args.block_kb * 1024))
+    if args.compare:
+        stem, extension = os.path.splitext(args.output)
+        scratch = stem + '.compare' + extension
+        report('Download then merge', download_then_merge(args.video, args.audio, scratch,
+                                                          args.video_codec, args.audio_codec))
+        os.remove(scratch)
@@ -1,5 +1,7 @@
 import youtube_dl
 
+from remux import report, stream_remux
+
 # Specify the YouTube video URL
 url = "https://www.youtube.com/watch?v=d4L1Pte7zVc"
 
@@ -12,5 +14,16 @@ options = {
 # Create a YouTubeDL object
 ydl = youtube_dl.YoutubeDL(options)
 
-# Download the video
-ydl.download([url])
+# Pick the formats without downloading anything
+info = ydl.extract_info(url, download=False)
+formats = info.get('requested_formats')
+
+if formats:
+    # Separate video and audio: pipe both straight into ffmpeg instead of
+    # saving them as two files and merging afterwards
+    video, audio = formats
+    output = ydl.prepare_filename(info)
+    report(output, stream_remux(video['url'], audio['url'], output, headers=video.get('http_headers')))
+else:
+    # A single combined format needs no merging
+    ydl.download([url])
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+
+
+def video_id(url):
+    """The 11 character video ID in a watch, youtu.be, shorts or embed URL,
+    or None for anything else."""
+    parts = urlsplit(url)
+    if parts.hostname and parts.hostname.endswith('youtu.be'):
+        return parts.path.strip('/').split('/')[0] or None
+    if 'v' in parse_qs(parts.query):
+        return parse_qs(parts.query)['v'][0]
+    segments = parts.path.strip('/').split('/')
+    if len(segments) >= 2 and segments[0] in ('shorts', 'embed', 'live', 'v'):
+        return segments[1]
+    return None
+
+
+class JsonStore:
+    """A dict saved to a JSON file after every change."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+
+    def save(self):
+        # Write to a temporary file first so a crash never leaves half a cache
+        if not self.path:
+            return
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(self.data, f)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class StreamCache(JsonStore):
+    """Stream metadata per video ID, kept for ttl seconds.
+
+    Stream URLs stop working at the time in their expire parameter, so an
+    entry never outlives its earliest stream URL either.
+    """
+
+    def __init__(self, path='stream_cache.json', ttl=4 * 3600):
+        super().__init__(path)
+        self.ttl = ttl
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+        if entry and entry['expires'] > time.time():
+            return entry
+        return None
+
+    def put(self, key, title, streams):
+        expires = time.time() + self.ttl
+        for stream in streams:
+            expire = parse_qs(urlsplit(stream['url']).query).get('expire')
+            if expire:
+                # A minute of slack so a download does not start on a dying URL
+                expires = min(expires, int(expire[0]) - 60)
+        entry = {'title': title, 'streams': streams, 'fetched': time.time(), 'expires': expires}
+        with self.lock:
+            self.data[key] = entry
+            self.save()
+        return entry
+
+
+def fetch_streams(url):
+    # The one place the watch page is fetched and parsed
+    from pytube import YouTube
+    YouTube.DEFAULT_USER_AGENT = USER_AGENT
+    yt = YouTube(url)
+    streams = [{'itag': s.itag, 'url': s.url, 'mime_type': s.mime_type, 'resolution': s.resolution,
+                'abr': s.abr, 'progressive': s.is_progressive, 'filename': s.default_filename}
+               for s in yt.streams]
+    return yt.title, streams
+
+
+def resolve_streams(url, cache=None):
+    """Stream metadata for a video, from the cache when it is still fresh."""
+    key = video_id(url) or url
+    entry = cache.get(key) if cache else None
+    if entry is None:
+        title, streams = fetch_streams(url)
+        entry = cache.put(key, title, streams) if cache else {'title': title, 'streams': streams}
+    return entry
+
+
+def pick_stream(streams, resolution='720p', progressive=True):
+    """The first stream at resolution, else the highest resolution one."""
+    for stream in streams:
+        if stream['resolution'] == resolution and stream['progressive'] == progressive:
+            return stream
+    candidates = [s for s in streams if s['resolution'] and s['progressive'] == progressive] or \
+                 [s for s in streams if s['resolution']] or streams
+    return max(candidates, key=lambda s: int((s['resolution'] or '0p')[:-1]))
+
+
+class YoutubeResolver:
+    """A resolve function for DownloadManager that turns a YouTube URL into
+    (stream URL, filename, key).
+
+    The key names the video and the requested resolution, so a different
+    quality is a different download, and the filename names the video and
+    itag, so videos with the same title never share a file. key(url) works it out from the URL
+    alone, so DownloadManager can skip a finished download without
+    fetching the watch page.
+    """
+
+    def __init__(self, resolution='720p', cache=None):
+        self.resolution = resolution
+        self.cache = cache
+
+    def key(self, url):
+        return f"{video_id(url) or url}:{self.resolution}"
+
+    def filename(self, url, stream):
+        # pytube's default name is just the title, so add the video and format
+        name, ext = os.path.splitext(stream['filename'])
+        return f"{name} [{video_id(url) or 'video'}-{stream['itag']}]{ext}"
+
+    def __call__(self, url):
+        stream = pick_stream(resolve_streams(url, self.cache)['streams'], self.resolution)
+        return stream['url'], self.filename(url, stream), self.key(url)
+
+
+def youtube_resolver(resolution='720p', cache=None):
+    return YoutubeResolver(resolution, cache)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DownloadIndex(JsonStore):
+    """Finished downloads by key and by content hash.
+
+    lookup(key) returns the file already downloaded for a key, so a
+    re-queued URL is skipped. add() hashes a new file, and if the same
+    content is already on disk under another name it is replaced by a
+    hard link to that file.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.data.setdefault('keys', {})
+        self.data.setdefault('hashes', {})
+
+    def lookup(self, key):
+        with self.lock:
+            path = self.data['keys'].get(key)
+        if path and os.path.exists(path):
+            return path
+        return None
+
+    def add(self, key, path):
+        digest = file_hash(path)
+        with self.lock:
+            existing = self.data['hashes'].get(digest)
+            if existing and existing != path and os.path.exists(existing):
+                try:
+                    os.remove(path)
+                    os.link(existing, path)
+                except OSError:
+                    # No hard links here (e.g. another filesystem); keep the copy
+                    if not os.path.exists(path):
+                        path = existing
+            else:
+                self.data['hashes'][digest] = path
+            self.data['keys'][key] = path
+            self.save()
+        return path
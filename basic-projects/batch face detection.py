@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool
+
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'car-pedestrian'))
+from detection_config import DetectionConfig
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+# Loaded once per worker process by the pool initializer
+face_cascade = None
+config = None
+annotated_dir = None
+
+
+def load_cascade(cascade_file):
+    # CascadeClassifier does not raise on a bad path, it just comes back empty
+    cascade = cv2.CascadeClassifier(cascade_file)
+    if cascade.empty():
+        raise ValueError(f"could not load the face cascade from {cascade_file}")
+    return cascade
+
+
+def init_worker(cascade_file, config_values, annotate_to):
+    global face_cascade, config, annotated_dir
+    # One process per core already, so keep OpenCV from spawning its own threads
+    cv2.setNumThreads(1)
+    face_cascade = load_cascade(cascade_file)
+    config = DetectionConfig.from_dict(config_values)
+    annotated_dir = annotate_to
+
+
+def detect_faces(item):
+    path, name = item
+    try:
+        img = cv2.imread(path)
+        if img is None:
+            return {'path': path, 'error': 'could not read image'}
+
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        faces = config.detect(face_cascade, gray)
+
+        if annotated_dir:
+            for (x, y, w, h) in faces:
+                cv2.rectangle(img, (x, y), (x + w, y + h), (225, 0, 0), 2)
+            # Keep the input's folder layout so same-named files do not overwrite each other
+            destination = os.path.join(annotated_dir, name)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            cv2.imwrite(destination, img)
+    except (cv2.error, OSError) as err:
+        # One broken image should not end the whole run
+        return {'path': path, 'error': str(err).strip()}
+    return {'path': path, 'width': img.shape[1], 'height': img.shape[0],
+            'faces': [list(box) for box in faces]}
+
+
+def relative_name(path, root):
+    # Path of an image under its input root, used to name its annotated copy
+    name = os.path.relpath(path, root)
+    if name.startswith(os.pardir):
+        # Outside the root (e.g. ../ in a .txt list), so use the full path instead
+        name = os.path.abspath(path).lstrip(os.sep)
+    return name
+
+
+def list_images(sources):
+    """Yield (path, relative name) for every image in sources.
+
+    Directories are walked recursively, .txt files list one image per line
+    (relative to the list's folder for naming).
+    """
+    for source in sources:
+        if os.path.isdir(source):
+            for folder, _, files in os.walk(source):
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        path = os.path.join(folder, name)
+                        yield path, relative_name(path, source)
+        elif source.endswith('.txt'):
+            root = os.path.dirname(source)
+            with open(source) as f:
+                for line in f:
+                    if line.strip():
+                        yield line.strip(), relative_name(line.strip(), root)
+        else:
+            yield source, os.path.basename(source)
+
+
+def batches(items, size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detect faces in a batch of images')
+    parser.add_argument('sources', nargs='+', help='image files, directories or .txt file lists')
+    parser.add_argument('--cascade', default='haarcascade_frontalface_default.xml')
+    parser.add_argument('--output', default=None, help='JSON lines file (default: stdout)')
+    parser.add_argument('--annotate', default=None, help='save images with the faces drawn here')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    try:
+        # Fail here with a clear message rather than in every worker
+        load_cascade(args.cascade)
+    except ValueError as err:
+        parser.error(str(err))
+    if args.annotate:
+        os.makedirs(args.annotate, exist_ok=True)
+    detection = DetectionConfig(scale=args.scale, scale_factor=1.1, min_neighbors=4).to_dict()
+    output = open(args.output, 'w') if args.output else sys.stdout
+
+    start = time.perf_counter()
+    count = faces = errors = 0
+    workers = args.workers or os.cpu_count() or 1
+    with Pool(workers, initializer=init_worker,
+              initargs=(args.cascade, detection, args.annotate)) as pool:
+        # The pool reads its whole input iterator up front, so hand it the
+        # file list a batch at a time to keep memory bounded on huge scans
+        for batch in batches(list_images(args.sources), workers * 32 * 4):
+            for result in pool.imap_unordered(detect_faces, batch, chunksize=32):
+                output.write(json.dumps(result) + '\n')
+                count += 1
+                faces += len(result.get('faces', []))
+                if 'error' in result:
+                    errors += 1
+                    print(f"{result['path']}: {result['error']}", file=sys.stderr)
+    if args.output:
+        output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Scanned {count} images ({errors} failed), found {faces} faces in {elapsed:.1f}s "
+          f"({count / elapsed if elapsed else 0:.1f} images/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,22 @@
+import os
+import sys
+
 import cv2
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'car-pedestrian'))
+from detection_config import DetectionConfig
+
 face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
 
+# Same settings as detectMultiScale(gray, 1.1, 4); set scale=0.5 to detect
+# on a half-size image, or roi to only search part of it
+config = DetectionConfig(scale_factor=1.1, min_neighbors=4)
+
 img = cv2.imread('test.png')
 
 gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
 
-faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+faces = config.detect(face_cascade, gray)
 for (x, y, w, h) in faces:
     cv2.rectangle(img, (x, y), (x + w, y +h), (225, 0, 0), 2)
 
@@ -14,4 +24,4 @@ cv2.imshow('img' , img)
 
 cv2.waitKey()
 
-cv2.imwrite("face_detected.jpg")
+cv2.imwrite("face_detected.jpg", img)
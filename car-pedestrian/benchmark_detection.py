@@ -0,0 +1,106 @@
+import argparse
+import json
+import statistics
+import time
+
+import cv2
+
+from detection_config import DetectionConfig
+from object_tracker import iou
+from profiling import percentile
+
+# Settings tried when no --configs file is given
+DEFAULT_CANDIDATES = [
+    {'scale': 1.0},
+    {'scale': 0.75},
+    {'scale': 0.5},
+    {'scale': 0.5, 'scale_factor': 1.2},
+    {'scale': 0.5, 'roi': (0, 0.4, 1, 1)},
+    {'scale': 0.5, 'roi': (0, 0.4, 1, 1), 'scale_factor': 1.2, 'min_neighbors': 4},
+]
+
+
+def read_frames(video_path, limit):
+    video = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < limit:
+        (read_successful, frame) = video.read()
+        if not read_successful:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    video.release()
+    return frames
+
+
+def match_counts(reference, candidate, threshold=0.5):
+    # Count candidate boxes that overlap an unclaimed reference box
+    claimed = set()
+    for box in candidate:
+        best, best_index = 0.0, None
+        for i, ref in enumerate(reference):
+            if i not in claimed and iou(box, ref) > best:
+                best, best_index = iou(box, ref), i
+        if best >= threshold:
+            claimed.add(best_index)
+    return len(claimed)
+
+
+def benchmark(video_path, classifier_file, candidates, frames=200, budget_ms=None):
+    """Compare detection settings for speed and agreement with a full-res scan.
+
+    The reference is a full-resolution scan with default settings. Recall is
+    the share of reference boxes a candidate also finds; precision is the
+    share of candidate boxes that match a reference box (IoU >= 0.5).
+    """
+    cascade = cv2.CascadeClassifier(classifier_file)
+    grays = read_frames(video_path, frames)
+    reference_config = DetectionConfig()
+    reference = [reference_config.detect(cascade, gray) for gray in grays]
+
+    rows = []
+    for values in candidates:
+        config = DetectionConfig.from_dict(values)
+        timings, matched, found = [], 0, 0
+        for gray, expected in zip(grays, reference):
+            start = time.perf_counter()
+            boxes = config.detect(cascade, gray)
+            timings.append((time.perf_counter() - start) * 1000)
+            matched += match_counts(expected, boxes)
+            found += len(boxes)
+        expected_total = sum(len(boxes) for boxes in reference)
+        rows.append({
+            'config': config.to_dict(),
+            'median_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 95),
+            'recall': matched / expected_total if expected_total else 1.0,
+            'precision': matched / found if found else 1.0,
+        })
+
+    print(f"{'median ms':>10} {'p95 ms':>8} {'recall':>7} {'precision':>9}  config")
+    for row in rows:
+        flag = ' *' if budget_ms and row['p95_ms'] <= budget_ms else ''
+        print(f"{row['median_ms']:10.1f} {row['p95_ms']:8.1f} {row['recall']:7.2f} "
+              f"{row['precision']:9.2f}  {row['config']}{flag}")
+    if budget_ms:
+        print(f"* p95 within the {budget_ms} ms budget")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cascade detection settings on a reference clip')
+    parser.add_argument('video', nargs='?', default='Tesla.mp4')
+    parser.add_argument('--classifier', default='car_detector.xml')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--configs', default=None, help='JSON file with a list of DetectionConfig dicts')
+    parser.add_argument('--budget-ms', type=float, default=None)
+    parser.add_argument('--report', default=None, help='save the results to this JSON file')
+    args = parser.parse_args()
+
+    candidates = DEFAULT_CANDIDATES
+    if args.configs:
+        with open(args.configs) as f:
+            candidates = json.load(f)
+    rows = benchmark(args.video, args.classifier, candidates, args.frames, args.budget_ms)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,71 @@
+import json
+
+import cv2
+
+
+class DetectionConfig:
+    """Settings for a Haar cascade scan.
+
+    scale      detect on a frame resized by this factor (0.5 = half size) and
+               map the boxes back to full-frame coordinates
+    roi        (left, top, right, bottom) fractions of the frame to scan, e.g.
+               (0, 0.4, 1, 1) for the lower 60% where the road is
+    scale_factor, min_neighbors, min_size, max_size
+               passed to detectMultiScale; sizes are in full-frame pixels
+    """
+
+    def __init__(self, scale=1.0, roi=None, scale_factor=1.1, min_neighbors=3,
+                 min_size=None, max_size=None):
+        self.scale = scale
+        self.roi = tuple(roi) if roi else None
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size) if min_size else None
+        self.max_size = tuple(max_size) if max_size else None
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**values)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {'scale': self.scale, 'roi': self.roi, 'scale_factor': self.scale_factor,
+                'min_neighbors': self.min_neighbors, 'min_size': self.min_size,
+                'max_size': self.max_size}
+
+    def __repr__(self):
+        values = ', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())
+        return f'DetectionConfig({values})'
+
+    def _scaled_size(self, size):
+        if not size:
+            return None
+        return (max(1, int(size[0] * self.scale)), max(1, int(size[1] * self.scale)))
+
+    def detect(self, cascade, gray):
+        """Run cascade over a grayscale frame and return full-frame (x, y, w, h) boxes."""
+        frame_h, frame_w = gray.shape[:2]
+        left = top = 0
+        if self.roi:
+            left, top = int(self.roi[0] * frame_w), int(self.roi[1] * frame_h)
+            right, bottom = int(self.roi[2] * frame_w), int(self.roi[3] * frame_h)
+            gray = gray[top:bottom, left:right]
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        options = {'scaleFactor': self.scale_factor, 'minNeighbors': self.min_neighbors}
+        if self.min_size:
+            options['minSize'] = self._scaled_size(self.min_size)
+        if self.max_size:
+            options['maxSize'] = self._scaled_size(self.max_size)
+        found = cascade.detectMultiScale(gray, **options)
+
+        boxes = []
+        for (x, y, w, h) in found:
+            boxes.append((int(x / self.scale) + left, int(y / self.scale) + top,
+                          int(w / self.scale), int(h / self.scale)))
+        return boxes
@@ -0,0 +1,210 @@
+import heapq
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from detection_config import DetectionConfig
+from profiling import stage
+
+
+def draw_boxes(frame, boxes):
+    # draw rectangles around the detected objects
+    for box in boxes:
+        (x, y, w, h) = box[:4]
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+
+
+class CascadeDetector:
+    """Grayscale a BGR frame and run a Haar cascade over it.
+
+    Every detector worker owns its own instance, since a CascadeClassifier
+    must not be shared between threads.
+    """
+
+    def __init__(self, classifier_file, config=None):
+        self.cascade = cv2.CascadeClassifier(classifier_file)
+        if self.cascade.empty():
+            raise ValueError(f"could not load cascade from {classifier_file}")
+        self.config = config or DetectionConfig()
+        self.profiler = None
+
+    def __call__(self, frame):
+        with stage(self.profiler, 'color convert'):
+            grayscaled_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with stage(self.profiler, 'detect'):
+            return self.config.detect(self.cascade, grayscaled_frame)
+
+
+_DONE = object()
+
+
+def _put(q, item, stop):
+    # Block on a full queue, but give up once the pipeline is stopping
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _read_frames(video, frames, stop, workers, profiler, errors):
+    index = 0
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            with stage(profiler, 'decode'):
+                (read_successful, frame) = video.read()
+            if not read_successful:
+                break
+            if profiler is not None:
+                profiler.frame_started(index, started)
+            _put(frames, (index, frame), stop)
+            index += 1
+    except Exception as e:
+        # Raised again in run_pipeline once the detectors have stopped
+        errors.append(e)
+    finally:
+        for _ in range(workers):
+            _put(frames, _DONE, stop)
+
+
+def _detect_frames(detector, frames, results, stop):
+    while not stop.is_set():
+        try:
+            item = frames.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            _put(results, _DONE, stop)
+            return
+        index, frame = item
+        try:
+            boxes = detector(frame)
+        except Exception as e:
+            boxes = e
+        _put(results, (index, frame, boxes), stop)
+
+
+def run_pipeline(video_path, classifier_file=None, workers=None, output_path=None,
+                 draw=draw_boxes, window_name="Detections", make_detector=None,
+                 queue_size=None, config=None, profiler=None):
+    """Detect objects in every frame of a video using a pool of threads.
+
+    A reader thread decodes frames into a bounded queue, detector threads
+    (one cascade each) pick them up in parallel, and the calling thread
+    draws and shows or writes them back in the original frame order.
+
+    If output_path is given the pipeline runs headless and writes the
+    annotated video there instead of calling cv2.imshow. Press q to stop
+    early in windowed mode.
+
+    Pass a profiling.FrameProfiler to time each stage and frame.
+
+    Detectors with a true `sequential` attribute keep state between frames
+    (see object_tracker.TrackingDetector), so only one of them is used.
+
+    detectMultiScale already spreads one call over OpenCV's own thread
+    pool, so with more than one detector thread OpenCV is limited to one
+    thread per call (restored afterwards) rather than every detector thread
+    asking for every core. Whether several detector threads beat one is up
+    to the machine; compare the FPS of --workers 1 and --workers N.
+
+    Returns the number of frames processed and the average FPS.
+    """
+    workers = workers or os.cpu_count() or 1
+    make_detector = make_detector or (lambda: CascadeDetector(classifier_file, config))
+    # Build the detectors up front so a bad cascade fails before any thread starts
+    detectors = [make_detector()]
+    if not getattr(detectors[0], 'sequential', False):
+        detectors += [make_detector() for _ in range(workers - 1)]
+    workers = len(detectors)
+    for detector in detectors:
+        if hasattr(detector, 'profiler'):
+            detector.profiler = profiler
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"could not open video {video_path}")
+    fps = video.get(cv2.CAP_PROP_FPS) or 30
+    if profiler is not None and profiler.frame_budget is None:
+        profiler.frame_budget = 1.0 / fps
+
+    # Bounded queues keep the reader from decoding the whole video ahead
+    frames = queue.Queue(maxsize=queue_size or workers * 2)
+    results = queue.Queue(maxsize=queue_size or workers * 2)
+    stop = threading.Event()
+    errors = []
+    threads = [threading.Thread(target=_read_frames, args=(video, frames, stop, workers, profiler, errors),
+                                daemon=True)]
+    threads += [threading.Thread(target=_detect_frames, args=(detector, frames, results, stop), daemon=True)
+                for detector in detectors]
+    opencv_threads = cv2.getNumThreads()
+    if workers > 1:
+        # Parallelism comes from the detector threads, not from inside OpenCV
+        cv2.setNumThreads(1)
+    for thread in threads:
+        thread.start()
+
+    writer = None
+    pending = []
+    next_index = 0
+    running = workers
+    start = time.perf_counter()
+    try:
+        while running:
+            try:
+                item = results.get(timeout=0.5)
+            except queue.Empty:
+                # Never wait forever on threads that died without saying so
+                if not any(thread.is_alive() for thread in threads):
+                    raise RuntimeError("pipeline threads stopped before the video was finished")
+                continue
+            if item is _DONE:
+                running -= 1
+                continue
+            heapq.heappush(pending, (item[0], id(item), item))
+            # Only render once the next frame in order has arrived
+            while pending and pending[0][0] == next_index:
+                index, frame, boxes = heapq.heappop(pending)[2]
+                next_index += 1
+                if isinstance(boxes, Exception):
+                    raise boxes
+                with stage(profiler, 'draw'):
+                    draw(frame, boxes)
+                if output_path:
+                    with stage(profiler, 'write'):
+                        if writer is None:
+                            height, width = frame.shape[:2]
+                            writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'),
+                                                     fps, (width, height))
+                        writer.write(frame)
+                else:
+                    with stage(profiler, 'display'):
+                        cv2.imshow(window_name, frame)
+                        # stop when q is pressed
+                        key = cv2.waitKey(1)
+                if profiler is not None:
+                    profiler.frame_finished(index)
+                if not output_path and (key == 81 or key == 113):
+                    raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        video.release()
+        cv2.setNumThreads(opencv_threads)
+        if writer is not None:
+            writer.release()
+        if not output_path:
+            cv2.destroyAllWindows()
+
+    if errors:
+        raise errors[0]
+    elapsed = time.perf_counter() - start
+    return next_index, next_index / elapsed if elapsed else 0.0
@@ -0,0 +1,162 @@
+import json
+
+import cv2
+import numpy as np
+
+from detection_config import DetectionConfig
+from profiling import stage
+
+
+def iou(a, b):
+    # intersection over union of two (x, y, w, h) boxes
+    ax, ay, aw, ah = a[:4]
+    bx, by, bw, bh = b[:4]
+    overlap_w = min(ax + aw, bx + bw) - max(ax, bx)
+    overlap_h = min(ay + ah, by + bh) - max(ay, by)
+    if overlap_w <= 0 or overlap_h <= 0:
+        return 0.0
+    intersection = overlap_w * overlap_h
+    return intersection / float(aw * ah + bw * bh - intersection)
+
+
+class Track:
+    def __init__(self, track_id, box, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.missed = 0
+        self.trajectory = []
+        self.update(box, frame_index)
+
+    def update(self, box, frame_index):
+        (x, y, w, h) = box
+        self.box = box
+        self.missed = 0
+        self.trajectory.append((frame_index, x + w // 2, y + h // 2))
+
+
+class TrackingDetector:
+    """Detect objects by tracking them between occasional full cascade scans.
+
+    A full multi-scale scan runs every `full_scan_every` frames, when the
+    scene changes (mean absolute difference of a thumbnail above
+    `scene_change_threshold`) or when nothing is being tracked. On the other
+    frames only a window around each tracked box, grown by `roi_margin`, is
+    rescanned. Detections are matched to tracks by IoU, so each object keeps
+    the same ID from frame to frame. Full scans use `config`; ROI rescans
+    reuse its scaleFactor/minNeighbors at full resolution.
+
+    Called with a BGR frame, returns (x, y, w, h, track_id) tuples.
+    """
+
+    # Tracking depends on the previous frame, so frames must come in order
+    sequential = True
+
+    def __init__(self, classifier_file, full_scan_every=10, scene_change_threshold=25.0,
+                 roi_margin=0.5, max_missed=3, iou_threshold=0.3, config=None):
+        self.cascade = cv2.CascadeClassifier(classifier_file)
+        if self.cascade.empty():
+            raise ValueError(f"could not load cascade from {classifier_file}")
+        self.config = config or DetectionConfig()
+        self.full_scan_every = full_scan_every
+        self.scene_change_threshold = scene_change_threshold
+        self.roi_margin = roi_margin
+        self.max_missed = max_missed
+        self.iou_threshold = iou_threshold
+        self.frame_index = 0
+        self.next_id = 0
+        self.tracks = []
+        self.finished = []
+        self.full_scans = 0
+        self.profiler = None
+        self._thumbnail = None
+
+    def _scene_changed(self, gray):
+        thumbnail = cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA).astype(np.int16)
+        changed = (self._thumbnail is not None and
+                   np.abs(thumbnail - self._thumbnail).mean() > self.scene_change_threshold)
+        self._thumbnail = thumbnail
+        return changed
+
+    def _rescan_tracks(self, gray):
+        frame_h, frame_w = gray.shape[:2]
+        detections = []
+        for track in self.tracks:
+            (x, y, w, h) = track.box
+            margin_x, margin_y = int(w * self.roi_margin), int(h * self.roi_margin)
+            left, top = max(0, x - margin_x), max(0, y - margin_y)
+            right, bottom = min(frame_w, x + w + margin_x), min(frame_h, y + h + margin_y)
+            roi = gray[top:bottom, left:right]
+            found = self.cascade.detectMultiScale(roi, scaleFactor=self.config.scale_factor,
+                                                  minNeighbors=self.config.min_neighbors,
+                                                  minSize=(w // 2, h // 2))
+            for (rx, ry, rw, rh) in found:
+                detections.append((int(rx + left), int(ry + top), int(rw), int(rh)))
+        return detections
+
+    def _match(self, detections):
+        # Greedily pair the highest-overlap detection/track pairs first
+        pairs = sorted(((iou(track.box, box), t, d)
+                        for t, track in enumerate(self.tracks)
+                        for d, box in enumerate(detections)), reverse=True)
+        matched_tracks, matched_detections = set(), set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in matched_tracks or d in matched_detections:
+                continue
+            self.tracks[t].update(detections[d], self.frame_index)
+            matched_tracks.add(t)
+            matched_detections.add(d)
+        return matched_tracks, matched_detections
+
+    def __call__(self, frame):
+        with stage(self.profiler, 'color convert'):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with stage(self.profiler, 'detect'):
+            return self._track(gray)
+
+    def _track(self, gray):
+        scene_changed = self._scene_changed(gray)
+        full_scan = (scene_changed or not self.tracks
+                     or self.frame_index % self.full_scan_every == 0)
+        if full_scan:
+            self.full_scans += 1
+            detections = self.config.detect(self.cascade, gray)
+        else:
+            detections = self._rescan_tracks(gray)
+
+        matched_tracks, matched_detections = self._match(detections)
+        alive = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+            if track.missed > self.max_missed:
+                self.finished.append(track)
+            else:
+                alive.append(track)
+        self.tracks = alive
+        # Only full scans may start new tracks; ROI rescans just follow them
+        if full_scan:
+            for d, box in enumerate(detections):
+                if d not in matched_detections:
+                    self.tracks.append(Track(self.next_id, box, self.frame_index))
+                    self.next_id += 1
+
+        self.frame_index += 1
+        return [track.box + (track.track_id,) for track in self.tracks if track.missed == 0]
+
+    def trajectories(self):
+        # {track_id: [(frame_index, center_x, center_y), ...]} for every track seen
+        return {track.track_id: track.trajectory for track in self.finished + self.tracks}
+
+    def save_trajectories(self, path):
+        with open(path, 'w') as f:
+            json.dump({str(k): v for k, v in self.trajectories().items()}, f)
+
+
+def draw_tracks(frame, tracks):
+    # draw each tracked object with its ID above the box
+    for (x, y, w, h, track_id) in tracks:
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        cv2.putText(frame, str(track_id), (x, max(0, y - 5)), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5, (0, 0, 255), 1)
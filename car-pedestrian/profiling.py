@@ -0,0 +1,141 @@
+import csv
+import json
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile: the smallest value with at least pct% of values at or below it
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def stage(profiler, name):
+    # Time a block when a profiler is attached, otherwise do nothing
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+class FrameProfiler:
+    """Per-stage timings, rolling FPS and frame latency for a video run.
+
+    Stages are timed with `with profiler.stage('detect'): ...` from any
+    thread. Frame latency runs from frame_started (before decode) to
+    frame_finished (after display/write). A frame is late when its latency
+    exceeds frame_budget seconds (1 / source FPS by default). A frame that
+    was decoded but never finished while a later frame was is counted as
+    dropped; frames still in flight when the run stops (e.g. q pressed) are
+    reported separately as unfinished.
+    """
+
+    def __init__(self, frame_budget=None, fps_window=30, log_every=0):
+        self.frame_budget = frame_budget
+        self.log_every = log_every
+        self.timings = defaultdict(list)
+        self.latencies = []
+        self._started = {}
+        self._last_finished = -1
+        self._finished_at = deque(maxlen=fps_window)
+        self._lock = threading.Lock()
+        self.start_time = None
+        self.end_time = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings[name].append(elapsed)
+
+    def frame_started(self, index, now=None):
+        now = now or time.perf_counter()
+        with self._lock:
+            if self.start_time is None:
+                self.start_time = now
+            self._started[index] = now
+
+    def frame_finished(self, index):
+        now = time.perf_counter()
+        with self._lock:
+            self.latencies.append(now - self._started.pop(index))
+            self._last_finished = max(self._last_finished, index)
+            self._finished_at.append(now)
+            self.end_time = now
+            frames = len(self.latencies)
+        if self.log_every and frames % self.log_every == 0:
+            print(f"frame {frames}: {self.rolling_fps():.1f} FPS, "
+                  f"latency {self.latencies[-1] * 1000:.0f} ms")
+
+    def rolling_fps(self):
+        # FPS over the last fps_window finished frames
+        if len(self._finished_at) < 2:
+            return 0.0
+        span = self._finished_at[-1] - self._finished_at[0]
+        return (len(self._finished_at) - 1) / span if span else 0.0
+
+    def report(self):
+        frames = len(self.latencies)
+        elapsed = (self.end_time - self.start_time) if frames else 0.0
+        stages = {}
+        for name, values in self.timings.items():
+            stages[name] = {
+                'count': len(values),
+                'total_ms': sum(values) * 1000,
+                'mean_ms': sum(values) / len(values) * 1000,
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+            }
+        late = sum(1 for v in self.latencies if self.frame_budget and v > self.frame_budget)
+        with self._lock:
+            dropped = sum(1 for index in self._started if index < self._last_finished)
+            unfinished = len(self._started) - dropped
+        return {
+            'frames': frames,
+            'seconds': elapsed,
+            'fps': frames / elapsed if elapsed else 0.0,
+            'rolling_fps': self.rolling_fps(),
+            'latency_p50_ms': percentile(self.latencies, 50) * 1000,
+            'latency_p95_ms': percentile(self.latencies, 95) * 1000,
+            'latency_p99_ms': percentile(self.latencies, 99) * 1000,
+            'late_frames': late,
+            'dropped_frames': dropped,
+            'unfinished_frames': unfinished,
+            'stages': stages,
+        }
+
+    def save(self, path):
+        """Write the report as JSON, or as CSV (one row per stage) for .csv paths."""
+        report = self.report()
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['stage', 'count', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+                for name, values in report['stages'].items():
+                    writer.writerow([name] + [round(values[k], 3) for k in
+                                              ('count', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms')])
+                writer.writerow(['frame_latency', report['frames'], round(report['seconds'] * 1000, 3), '',
+                                 round(report['latency_p50_ms'], 3), round(report['latency_p95_ms'], 3),
+                                 round(report['latency_p99_ms'], 3)])
+        else:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def summary(self):
+        report = self.report()
+        lines = [f"{report['frames']} frames in {report['seconds']:.2f}s ({report['fps']:.1f} FPS), "
+                 f"latency p50/p95/p99 {report['latency_p50_ms']:.0f}/{report['latency_p95_ms']:.0f}/"
+                 f"{report['latency_p99_ms']:.0f} ms, {report['late_frames']} late, "
+                 f"{report['dropped_frames']} dropped, {report['unfinished_frames']} unfinished"]
+        for name, values in report['stages'].items():
+            lines.append(f"  {name:<14} {values['mean_ms']:8.2f} ms mean {values['p95_ms']:8.2f} ms p95 "
+                         f"{values['total_ms'] / 1000:8.2f} s total")
+        return '\n'.join(lines)
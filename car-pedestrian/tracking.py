@@ -1,40 +1,57 @@
-import cv2
+import argparse
+
+from detection_pipeline import draw_boxes, run_pipeline
+from detection_config import DetectionConfig
+from object_tracker import TrackingDetector, draw_tracks
+from profiling import FrameProfiler
 
 # Load Image
 img_file = "cars.jpg"
-# load video
-video = cv2.VideoCapture('Tesla.mp4')
 
 # Our Pre trained car classifier
 classifier_file = "car_detector.xml"
 # classifier_file = cv2.cv.Load("car_detection.xml")
 
-#create a car classifier
-car_tracker = cv2.CascadeClassifier(classifier_file)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detect cars in a video')
+    parser.add_argument('video', nargs='?', default='Tesla.mp4')
+    parser.add_argument('--workers', type=int, default=None, help='number of detector threads')
+    parser.add_argument('--output', default=None,
+                        help='write the annotated video here instead of showing it')
+    parser.add_argument('--track-every', type=int, default=None,
+                        help='only run a full cascade scan every N frames and track objects in between')
+    parser.add_argument('--trajectories', default=None,
+                        help='save per-object trajectories to this JSON file (with --track-every)')
+    parser.add_argument('--config', default=None,
+                        help='JSON file with DetectionConfig settings (scale, roi, scale_factor, ...)')
+    parser.add_argument('--scale', type=float, default=None, help='detect on a frame resized by this factor')
+    parser.add_argument('--profile', default=None,
+                        help='save per-stage timings and frame latency to this .json or .csv file')
+    args = parser.parse_args()
+
+    profiler = FrameProfiler(log_every=100)
+
+    config = DetectionConfig.load(args.config) if args.config else DetectionConfig()
+    if args.scale:
+        config.scale = args.scale
+
+    tracker = None
+    if args.track_every:
+        tracker = TrackingDetector(classifier_file, full_scan_every=args.track_every, config=config)
 
-# Run forever until car stops or something
-while True:
-    # read the current frame
-    (read_successful, frame) = video.read()
-    print(read_successful, frame)
-    
-    # Safe coding
-    if read_successful: 
-        # must convert to grayscale
-        grayscaled_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    else:
-        break
-    # Detect cars
-    cars = car_tracker.detectMultiScale(grayscaled_frame)
-    # draw rectangles in the car frames
-    for car in cars:
-        (x,y,w,h) = car
-        cv2.rectangle(frame, (x,y), (x+w, y+h), (0, 0, 255), 2)
-    #Display the image with the cars spotted
-    # cv2.imshow("Car Test Image", black_n_white_img)
-    cv2.imshow("Car Moving", frame)
-    # To avoid autoclose (wait and listen for the close key)
-    cv2.waitKey(1) 
+    # Run until the video ends or q is pressed
+    frames, fps = run_pipeline(args.video, classifier_file, workers=args.workers, config=config,
+                               profiler=profiler,
+                               output_path=args.output, window_name="Car Moving",
+                               make_detector=tracker and (lambda: tracker),
+                               draw=draw_tracks if tracker else draw_boxes)
+    print(profiler.summary())
+    if args.profile:
+        profiler.save(args.profile)
+    if tracker:
+        print(f"Ran {tracker.full_scans} full scans, followed {tracker.next_id} objects")
+        if args.trajectories:
+            tracker.save_trajectories(args.trajectories)
 
 """
 # create opencv image
@@ -1,46 +1,63 @@
+import argparse
+
 import cv2
 
-# Load Image
-img_file = "cars.jpg"
-# load video
-video = cv2.VideoCapture('Pedestrians.mp4')
+from detection_pipeline import run_pipeline
+from detection_config import DetectionConfig
+from object_tracker import TrackingDetector, draw_tracks
+from profiling import FrameProfiler
 
-# Our Pre trained car classifier
+# Our Pre trained pedestrian classifier
 classifier_file = "pedestrians.xml"
 
-#create a car classifier
-pedestrian_tracker = cv2.CascadeClassifier(classifier_file)
-
-# Run forever until car stops or something
-while True:
-    # read the current frame
-    (read_successful, frame) = video.read()
-    print(read_successful, frame)
-    
-    # Safe coding
-    if read_successful: 
-        # must convert to grayscale
-        grayscaled_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    else:
-        break
-    # Detect cars
-    pedestrians = pedestrian_tracker.detectMultiScale(grayscaled_frame)
-    # draw rectangles in the car frames
+
+def draw_pedestrians(frame, pedestrians):
+    # draw rectangles in the pedestrian frames
     for pedestrian in pedestrians:
-        (x,y,w,h) = pedestrian
+        (x,y,w,h) = pedestrian[:4]
         cv2.rectangle(frame, (x+2,y+2), (x+w, y+h), (0, 0, 255), 2)
     for pedestrian in pedestrians:
-        (x,y,w,h) = pedestrian
+        (x,y,w,h) = pedestrian[:4]
         cv2.rectangle(frame, (x,y), (x+w, y+h), (0, 255, 255), 2)
-    #Display the image with the pedestrians spotted
-    # cv2.imshow("Car Test Image", black_n_white_img)
-    cv2.imshow("Car Moving", frame)
-    # To avoid autoclose (wait and listen for the close key)
-    key = cv2.waitKey(1) 
-    
-    # stop when q is pressed
-    if key==81 or key==113:
-        break
-    
-    
-video.release()
\ No newline at end of file
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detect pedestrians in a video')
+    parser.add_argument('video', nargs='?', default='Pedestrians.mp4')
+    parser.add_argument('--workers', type=int, default=None, help='number of detector threads')
+    parser.add_argument('--output', default=None,
+                        help='write the annotated video here instead of showing it')
+    parser.add_argument('--track-every', type=int, default=None,
+                        help='only run a full cascade scan every N frames and track objects in between')
+    parser.add_argument('--trajectories', default=None,
+                        help='save per-object trajectories to this JSON file (with --track-every)')
+    parser.add_argument('--config', default=None,
+                        help='JSON file with DetectionConfig settings (scale, roi, scale_factor, ...)')
+    parser.add_argument('--scale', type=float, default=None, help='detect on a frame resized by this factor')
+    parser.add_argument('--profile', default=None,
+                        help='save per-stage timings and frame latency to this .json or .csv file')
+    args = parser.parse_args()
+
+    profiler = FrameProfiler(log_every=100)
+
+    config = DetectionConfig.load(args.config) if args.config else DetectionConfig()
+    if args.scale:
+        config.scale = args.scale
+
+    tracker = None
+    if args.track_every:
+        tracker = TrackingDetector(classifier_file, full_scan_every=args.track_every, config=config)
+
+    # Run until the video ends or q is pressed
+    frames, fps = run_pipeline(args.video, classifier_file, workers=args.workers, config=config,
+                               profiler=profiler,
+                               output_path=args.output, window_name="Car Moving",
+                               make_detector=tracker and (lambda: tracker),
+                               draw=draw_tracks if tracker else draw_pedestrians)
+    print(profiler.summary())
+    if args.profile:
+        profiler.save(args.profile)
+    if tracker:
+        print(f"Ran {tracker.full_scans} full scans, followed {tracker.next_id} objects")
+        if args.trajectories:
+            tracker.save_trajectories(args.trajectories)
@@ -0,0 +1,10 @@
+kubectl apply -f Manifests/01_pvc_extract.yml
+kubectl apply -f Manifests/02_pvc_transform.yml
+kubectl apply -f Manifests/03_pvc_load.yml
+kubectl apply -f Manifests/04_pod_extract.yml
+kubectl wait --for=jsonpath='{.status.phase}'=Succeeded pod/pod-extract --timeout=300s
+kubectl apply -f Manifests/08_job_transform_partitioned.yml
+kubectl wait --for=condition=complete job/job-transform-partitioned --timeout=1800s
+kubectl apply -f Manifests/09_pod_load_partitioned.yml
+kubectl wait --for=jsonpath='{.status.phase}'=Succeeded pod/pod-load-partitioned --timeout=300s
+kubectl apply -f Manifests/07_pod_list_files.yml
@@ -0,0 +1,50 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+
+COLUMNS = ['passenger_count', 'total_amount']
+# Same filter as transform.sql; for Parquet it is pushed down to skip row
+# groups whose min/max statistics cannot match
+FILTER = (ds.field('passenger_count') > 2) & (ds.field('total_amount') > 0)
+
+
+def columnar_partitions(path, partitions):
+    """Split a columnar file into `partitions` lists of row group (Parquet)
+    or record batch (Arrow IPC) ids."""
+    if path.endswith('.parquet'):
+        fragment = next(ds.dataset(path, format='parquet').get_fragments())
+        # Row groups ruled out by their statistics are dropped here already
+        ids = [piece.row_groups[0].id for piece in fragment.split_by_row_group(FILTER)]
+    else:
+        with pa.memory_map(path) as source:
+            ids = list(range(ipc.open_file(source).num_record_batches))
+    return [ids[i::partitions] for i in range(partitions)]
+
+
+def read_filtered(path, ids):
+    if path.endswith('.parquet'):
+        fragment = next(ds.dataset(path, format='parquet').get_fragments())
+        return fragment.subset(row_group_ids=ids).to_table(columns=COLUMNS, filter=FILTER)
+    # IPC files are memory-mapped, so only the projected columns are paged in.
+    # Filtering copies the matching rows out before the map is closed
+    with pa.memory_map(path) as source:
+        reader = ipc.open_file(source)
+        table = pa.Table.from_batches([reader.get_batch(i) for i in ids], schema=reader.schema)
+        return table.select(COLUMNS).filter(FILTER)
+
+
+def transform_columnar(path, ids):
+    """Aggregate the given row groups/batches into
+    {passenger_count: [rows, passengers, amount]}."""
+    if not ids:
+        return {}
+    table = read_filtered(path, ids)
+    table = table.set_column(0, 'passenger_count', pc.cast(table['passenger_count'], pa.int64()))
+    grouped = table.group_by('passenger_count').aggregate(
+        [('passenger_count', 'count'), ('passenger_count', 'sum'), ('total_amount', 'sum')])
+    totals = {}
+    for row in grouped.to_pylist():
+        totals[row['passenger_count']] = [row['passenger_count_count'], row['passenger_count_sum'],
+                                          row['total_amount_sum']]
+    return totals
@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import load
+import transform
+import transform_sqlite
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Stages run on threads, and forking a process that has other threads running
+# can copy a held lock into the child, so the transform pool never forks
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class Stage:
+    """One step of the pipeline.
+
+    function(config, outputs) runs the step and returns the files it wrote;
+    outputs maps each finished stage name to its files. A stage is keyed on
+    the config values in params, the content of the external input files
+    named in inputs, the source of modules, and the keys of the stages it
+    runs after, so it is only rerun when one of those changes.
+    """
+
+    def __init__(self, name, function, after=(), inputs=(), params=(), modules=()):
+        self.name = name
+        self.function = function
+        self.after = tuple(after)
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        self.modules = tuple(modules)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(stage, config, keys):
+    digest = hashlib.sha256(stage.name.encode())
+    digest.update(json.dumps({p: config[p] for p in stage.params}, sort_keys=True).encode())
+    for key in stage.inputs:
+        digest.update(file_hash(config[key]).encode())
+    for module in stage.modules:
+        digest.update(file_hash(os.path.join(HERE, module)).encode())
+    for name in stage.after:
+        digest.update(keys[name].encode())
+    return digest.hexdigest()
+
+
+def stage_dir(config, name):
+    path = os.path.join(config['work_dir'], name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def extract_stage(config, outputs):
+    # Same as pod-extract (a plain copy), or extract.py when columnar is set
+    source = config['source']
+    if config['columnar']:
+        from extract import extract
+        stem = os.path.basename(source).split('.')[0]
+        destination = os.path.join(stage_dir(config, 'extract'), stem + '.parquet')
+        extract(source, destination)
+    else:
+        destination = os.path.join(stage_dir(config, 'extract'), os.path.basename(source))
+        shutil.copyfile(source, destination)
+    return [destination]
+
+
+def transform_stage(config, outputs):
+    path = outputs['extract'][0]
+    output_dir = stage_dir(config, 'transform')
+    transform.run(path, output_dir, config['partitions'], workers=config['workers'], start_method=START_METHOD)
+    return load.read_manifest(transform.manifest_path(output_dir, path))
+
+
+def transform_sqlite_stage(config, outputs):
+    database = os.path.join(stage_dir(config, 'transform'), 'transform.sqlite')
+    rows, rate = transform_sqlite.bulk_load(config['source'], database)
+    print(f"Bulk load: {rows} rows written, {rate:,.0f} input rows/s")
+    return [database]
+
+
+def load_stage(config, outputs):
+    path = os.path.join(stage_dir(config, 'load'), 'load.csv')
+    load.write_load(load.read_partials(outputs['transform']), path)
+    return [path]
+
+
+def load_sqlite_stage(config, outputs):
+    # What load_aggregate.sql does in pod-load
+    connection = sqlite3.connect(outputs['transform_sqlite'][0])
+    totals = {row[0]: list(row[1:]) for row in connection.execute(
+        'select passenger_count, rows, passengers, amount from passenger_totals')}
+    connection.close()
+    path = os.path.join(stage_dir(config, 'load'), 'load_sqlite.csv')
+    load.write_load(totals, path)
+    return [path]
+
+
+STAGES = [
+    Stage('extract', extract_stage, inputs=['source'], params=['columnar'],
+          modules=['extract.py']),
+    Stage('transform', transform_stage, after=['extract'], params=['partitions'],
+          modules=['transform.py', 'columnar.py']),
+    Stage('transform_sqlite', transform_sqlite_stage, inputs=['source'],
+          modules=['transform.py', 'transform_sqlite.py']),
+    Stage('load', load_stage, after=['transform'], modules=['load.py']),
+    Stage('load_sqlite', load_sqlite_stage, after=['transform_sqlite'], modules=['load.py']),
+]
+
+
+def _timed(function, config, outputs):
+    start = time.perf_counter()
+    files = function(config, outputs)
+    return files, time.perf_counter() - start
+
+
+def run_dag(stages, config, workers=2, force=False):
+    """Run stages in dependency order, independent ones side by side on a
+    thread pool (transform still uses its own process pool, see START_METHOD).
+
+    Stage outputs are remembered in <work_dir>/etl_cache.json by stage key,
+    so a stage whose key is unchanged and whose files still exist is
+    skipped. Returns {stage name: seconds taken, or None if cached}.
+    """
+    cache_path = os.path.join(config['work_dir'], 'etl_cache.json')
+    os.makedirs(config['work_dir'], exist_ok=True)
+    cache = {}
+    if os.path.exists(cache_path) and not force:
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    pending = {stage.name: stage for stage in stages}
+    keys, outputs, timings, running = {}, {}, {}, {}
+    with ThreadPoolExecutor(workers) as pool:
+        while pending or running:
+            ready = [s for s in pending.values() if all(name in outputs for name in s.after)]
+            for stage in ready:
+                del pending[stage.name]
+                keys[stage.name] = stage_key(stage, config, keys)
+                cached = cache.get(stage.name)
+                if (cached and cached['key'] == keys[stage.name]
+                        and all(os.path.exists(path) for path in cached['outputs'])):
+                    outputs[stage.name] = cached['outputs']
+                    timings[stage.name] = None
+                else:
+                    running[pool.submit(_timed, stage.function, config, dict(outputs))] = stage.name
+            if ready:
+                # Cached stages may have unblocked others
+                continue
+            if not running:
+                raise ValueError(f"stages {sorted(pending)} depend on stages that never run")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                outputs[name], timings[name] = future.result()
+                cache[name] = {'key': keys[name], 'outputs': outputs[name]}
+                with open(cache_path + '.tmp', 'w') as f:
+                    json.dump(cache, f, indent=1)
+                os.replace(cache_path + '.tmp', cache_path)
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run extract, transform and load in-process, skipping unchanged stages')
+    parser.add_argument('source', nargs='?', default='yellow_tripdata_2024-01.partial.csv')
+    parser.add_argument('--work-dir', default='etl_work')
+    parser.add_argument('--partitions', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--workers', type=int, default=None, help='processes for the transform stage')
+    parser.add_argument('--columnar', action='store_true', help='extract to Parquet first (needs pyarrow)')
+    parser.add_argument('--force', action='store_true', help='ignore the stage cache and rerun everything')
+    args = parser.parse_args()
+
+    config = {'source': args.source, 'work_dir': args.work_dir, 'partitions': args.partitions,
+              'workers': args.workers, 'columnar': args.columnar}
+    start = time.perf_counter()
+    timings = run_dag(STAGES, config, force=args.force)
+    for stage in STAGES:
+        seconds = timings[stage.name]
+        print(f"{stage.name:<18}{'cached' if seconds is None else f'{seconds:.2f}s'}")
+    print(f"{'total':<18}{time.perf_counter() - start:.2f}s")
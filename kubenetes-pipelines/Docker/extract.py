@@ -0,0 +1,62 @@
+import argparse
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# The only columns the transform and load stages use
+COLUMNS = ['passenger_count', 'total_amount']
+SCHEMA = pa.schema([('passenger_count', pa.float64()), ('total_amount', pa.float64())])
+
+
+def extract(source, destination, row_group_rows=1_000_000):
+    """Convert the taxi CSV (or a full TLC Parquet file) to a columnar file
+    holding only the needed columns.
+
+    The output format follows the destination extension: .parquet, or
+    .arrow/.feather for Arrow IPC. The CSV is read in streaming batches, so
+    memory stays bounded for full monthly files.
+    """
+    start = time.perf_counter()
+    if source.endswith('.parquet'):
+        batches = pq.ParquetFile(source).iter_batches(batch_size=row_group_rows, columns=COLUMNS)
+    else:
+        batches = pv.open_csv(
+            source,
+            read_options=pv.ReadOptions(block_size=64 * 1024 * 1024),
+            convert_options=pv.ConvertOptions(include_columns=COLUMNS, column_types=SCHEMA))
+
+    rows = 0
+    if destination.endswith('.parquet'):
+        writer = pq.ParquetWriter(destination + '.tmp', SCHEMA, compression='zstd')
+        write = lambda table: writer.write_table(table, row_group_size=row_group_rows)
+    else:
+        sink = pa.OSFile(destination + '.tmp', 'wb')
+        writer = ipc.new_file(sink, SCHEMA)
+        write = writer.write_table
+    try:
+        for batch in batches:
+            table = pa.Table.from_batches([batch]).select(COLUMNS).cast(SCHEMA)
+            write(table)
+            rows += len(table)
+    finally:
+        writer.close()
+        if not destination.endswith('.parquet'):
+            sink.close()
+    os.replace(destination + '.tmp', destination)
+
+    print(f"Extracted {rows} rows to {destination} ({os.path.getsize(destination) / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Project the taxi data to a columnar file for the transform stage')
+    parser.add_argument('source', nargs='?', default='/yellow_tripdata_2024-01.partial.csv')
+    parser.add_argument('destination', nargs='?', default='/extract/yellow_tripdata_2024-01.parquet')
+    parser.add_argument('--row-group-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    extract(args.source, args.destination, args.row_group_rows)
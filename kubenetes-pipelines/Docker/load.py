@@ -0,0 +1,160 @@
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+
+
+def read_manifest(path):
+    # Partials of the latest transform run for one extract, listed by transform.py
+    with open(path) as f:
+        names = json.load(f)['partials']
+    return [os.path.join(os.path.dirname(path), name) for name in names]
+
+
+def current_partials(input_dir):
+    """The partials named by every <extract>-partials.json manifest.
+
+    Only these are loaded, so stray partials from an older run with more
+    partitions are never counted.
+    """
+    paths = []
+    for manifest in sorted(glob.glob(os.path.join(input_dir, '*-partials.json'))):
+        paths += read_manifest(manifest)
+    return paths
+
+
+def read_partials(paths):
+    """Merge partial aggregates into {passenger_count: [rows, passengers, amount]}."""
+    totals = {}
+    for path in paths:
+        for passenger_count, group in read_partial(path).items():
+            merged = totals.setdefault(passenger_count, [0, 0, 0.0])
+            for i, value in enumerate(group):
+                merged[i] += value
+    return totals
+
+
+def read_partial(path):
+    totals = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            totals[int(row['passenger_count'])] = [int(row['rows']), int(row['passengers']),
+                                                   float(row['amount'])]
+    return totals
+
+
+def write_load(totals, path):
+    # Same output as load.sql: a single sum(passengers) column
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sum(passengers)'])
+        writer.writerow([sum(group[1] for group in totals.values())])
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def open_state(path):
+    connection = sqlite3.connect(path)
+    connection.executescript('''
+        create table if not exists loaded_partials (name text primary key, sha256 text);
+        create table if not exists partial_totals (
+            name text, passenger_count int, rows int, passengers int, amount float,
+            primary key (name, passenger_count));
+        create table if not exists totals (
+            passenger_count int primary key, rows int, passengers int, amount float);
+    ''')
+    return connection
+
+
+def _apply(connection, totals, sign):
+    # Add (sign=1) or take back (sign=-1) one partial's totals
+    for passenger_count, (rows, passengers, amount) in totals.items():
+        connection.execute(
+            'insert into totals values (?, ?, ?, ?) on conflict (passenger_count) do update set '
+            'rows = rows + excluded.rows, passengers = passengers + excluded.passengers, '
+            'amount = amount + excluded.amount',
+            (passenger_count, sign * rows, sign * passengers, sign * amount))
+
+
+def extract_of(name):
+    # <extract>-partial-NNNN.csv -> <extract>, as transform.partial_path names them
+    return name.rsplit('-partial-', 1)[0]
+
+
+def _remove(connection, name):
+    # Take a loaded partial's contribution back out of the running totals
+    old = {row[0]: list(row[1:]) for row in connection.execute(
+        'select passenger_count, rows, passengers, amount from partial_totals where name = ?', (name,))}
+    _apply(connection, old, -1)
+    connection.execute('delete from partial_totals where name = ?', (name,))
+    connection.execute('delete from loaded_partials where name = ?', (name,))
+
+
+def incremental_load(paths, state_path):
+    """Fold only new or changed partials into the running totals.
+
+    The state database remembers which partial files (by name and content
+    hash) were already loaded and what each contributed, so a run costs
+    O(new partials) rather than O(history). A partial that was rewritten
+    has its old contribution taken back before the new one is added. A
+    loaded partial missing from paths is only taken back out when its own
+    extract is still in paths (its manifest was rewritten without it);
+    extracts that are gone altogether, e.g. old months cleaned off the
+    volume, stay in the totals. Returns the number of partials loaded and
+    the current totals.
+    """
+    connection = open_state(state_path)
+    loaded = dict(connection.execute('select name, sha256 from loaded_partials'))
+    current = {os.path.basename(path) for path in paths}
+    extracts = {extract_of(name) for name in current}
+    for name in set(loaded) - current:
+        if extract_of(name) not in extracts:
+            continue
+        # Left over from an older run of an extract that was transformed again
+        with connection:
+            _remove(connection, name)
+    new = 0
+    for path in paths:
+        name = os.path.basename(path)
+        digest = file_hash(path)
+        if loaded.get(name) == digest:
+            continue
+        with connection:
+            if name in loaded:
+                _remove(connection, name)
+            totals = read_partial(path)
+            _apply(connection, totals, 1)
+            connection.executemany('insert into partial_totals values (?, ?, ?, ?, ?)',
+                                   [(name, k) + tuple(v) for k, v in totals.items()])
+            connection.execute('insert or replace into loaded_partials values (?, ?)', (name, digest))
+        new += 1
+
+    totals = {row[0]: list(row[1:]) for row in connection.execute(
+        'select passenger_count, rows, passengers, amount from totals')}
+    connection.close()
+    return new, totals
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Merge the partial aggregates written by transform.py')
+    parser.add_argument('--input-dir', default='/transform')
+    parser.add_argument('--output', default='/load/load.csv')
+    parser.add_argument('--state', default=None,
+                        help='SQLite state file; only partials not loaded before are processed')
+    args = parser.parse_args()
+
+    partials = current_partials(args.input_dir)
+    if args.state:
+        loaded, totals = incremental_load(partials, args.state)
+        print(f"Loaded {loaded} new partials, skipped {len(partials) - loaded} already loaded")
+    else:
+        totals = read_partials(partials)
+        print(f"Merged {len(partials)} partials")
+    write_load(totals, args.output)
+    print(f"{sum(g[1] for g in totals.values())} passengers")
@@ -0,0 +1,7 @@
+.mode csv
+.header on
+.output /load/load.csv
+
+# passenger_totals is precomputed by transform_sqlite.py, so this reads a
+# handful of rows instead of scanning passenger_amount
+select sum(passengers) as "sum(passengers)" from passenger_totals;
@@ -0,0 +1,185 @@
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import time
+from multiprocessing import get_context
+
+# Same filter as transform.sql: passenger_count > 2 and total_amount > 0
+MIN_PASSENGERS = 2
+MIN_AMOUNT = 0
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        header = f.readline()
+    return header, next(csv.reader([header.decode()]))
+
+
+def partition_ranges(path, partitions):
+    """Split the file after its header into byte ranges that start and end
+    on line boundaries."""
+    header, _ = read_header(path)
+    size = os.path.getsize(path)
+    start = len(header)
+    step = max(1, (size - start) // partitions)
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for i in range(1, partitions):
+            f.seek(max(bounds[-1], start + i * step))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def aggregate_rows(rows, columns):
+    """Filter rows and sum them per passenger count.
+
+    Returns {passenger_count: [rows, passengers, amount]}.
+    """
+    passenger_column = columns.index('passenger_count')
+    amount_column = columns.index('total_amount')
+    totals = {}
+    for row in rows:
+        if len(row) <= max(passenger_column, amount_column):
+            continue
+        passengers = number(row[passenger_column])
+        amount = number(row[amount_column])
+        if passengers is None or amount is None:
+            continue
+        if passengers > MIN_PASSENGERS and amount > MIN_AMOUNT:
+            group = totals.setdefault(int(passengers), [0, 0, 0.0])
+            group[0] += 1
+            group[1] += int(passengers)
+            group[2] += amount
+    return totals
+
+
+def transform_partition(path, start, end):
+    # Aggregate the rows in one byte range of the CSV
+    _, columns = read_header(path)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return aggregate_rows(csv.reader(io.StringIO(data.decode())), columns)
+
+
+def _transform_job(job):
+    path, part = job
+    if is_columnar(path):
+        from columnar import transform_columnar
+        return transform_columnar(path, part)
+    return transform_partition(path, *part)
+
+
+def is_columnar(path):
+    return path.endswith(('.parquet', '.arrow', '.feather'))
+
+
+def partitions_for(path, partitions):
+    if is_columnar(path):
+        # pyarrow is only needed for columnar inputs
+        from columnar import columnar_partitions
+        return columnar_partitions(path, partitions)
+    return partition_ranges(path, partitions)
+
+
+def write_partial(totals, path):
+    # Write through a temporary name so the load stage never sees half a file
+    with open(path + '.tmp', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['passenger_count', 'rows', 'passengers', 'amount'])
+        for passenger_count in sorted(totals):
+            writer.writerow([passenger_count] + totals[passenger_count])
+    os.replace(path + '.tmp', path)
+
+
+def source_stem(source):
+    return os.path.basename(source).split('.')[0]
+
+
+def partial_path(output_dir, source, index):
+    # Named after the extract, so partials from different months sit side by side
+    return os.path.join(output_dir, f'{source_stem(source)}-partial-{index:04d}.csv')
+
+
+def manifest_path(output_dir, source):
+    return os.path.join(output_dir, f'{source_stem(source)}-partials.json')
+
+
+def write_manifest(output_dir, source, count):
+    """Record which partials make up the latest run for this extract.
+
+    The load stage reads these manifests instead of globbing, and partials
+    numbered count or above (left by a run with more partitions) are
+    removed, so a repartitioned month is never counted twice. Every pod of
+    an indexed Job writes the same manifest, so the writes are idempotent.
+    """
+    partials = [os.path.basename(partial_path(output_dir, source, i)) for i in range(count)]
+    manifest = manifest_path(output_dir, source)
+    # Per-process temporary name, since several pods may write at once
+    temporary = f'{manifest}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump({'source': os.path.basename(source), 'partitions': count, 'partials': partials}, f)
+    os.replace(temporary, manifest)
+    for path in glob.glob(os.path.join(output_dir, f'{source_stem(source)}-partial-*.csv')):
+        index = os.path.basename(path)[:-len('.csv')].rsplit('-', 1)[1]
+        if not index.isdigit() or int(index) >= count:
+            os.remove(path)
+
+
+def run(path, output_dir, partitions, index=None, workers=None, start_method=None):
+    """Aggregate partitions of path into <extract>-partial-NNNN.csv files.
+
+    path is the extracted CSV, or a Parquet / Arrow IPC file written by
+    extract.py. Columnar inputs are split by row group or record batch and
+    read with only the two needed columns and the filter pushed down.
+
+    With index set, only that partition is processed (one pod of an indexed
+    Job). Otherwise every partition runs on a local process pool, started
+    with start_method ('spawn', 'forkserver', or the platform default).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    parts = partitions_for(path, partitions)
+    write_manifest(output_dir, path, len(parts))
+    indexes = [index] if index is not None else range(len(parts))
+    jobs = [(path, parts[i]) for i in indexes]
+
+    start = time.perf_counter()
+    if len(jobs) == 1:
+        results = [_transform_job(jobs[0])]
+    else:
+        with get_context(start_method).Pool(workers or len(jobs)) as pool:
+            results = pool.map(_transform_job, jobs)
+    for i, totals in zip(indexes, results):
+        write_partial(totals, partial_path(output_dir, path, i))
+
+    rows = sum(group[0] for totals in results for group in totals.values())
+    print(f"Transformed {len(jobs)} partitions ({rows} matching rows) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Filter and aggregate the taxi CSV in parallel partitions')
+    parser.add_argument('path', nargs='?', default='/extract/yellow_tripdata_2024-01.partial.csv')
+    parser.add_argument('--output-dir', default='/transform')
+    parser.add_argument('--partitions', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--index', type=int, default=None,
+                        help='only process this partition (defaults to $JOB_COMPLETION_INDEX if set)')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    index = args.index
+    if index is None and 'JOB_COMPLETION_INDEX' in os.environ:
+        index = int(os.environ['JOB_COMPLETION_INDEX'])
+    run(args.path, args.output_dir, args.partitions, index, args.workers)
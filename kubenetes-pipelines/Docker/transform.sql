@@ -4,10 +4,11 @@
 drop table if exists passenger_amount;create table passenger_amount (passengers int, amount float);
 
 # select relevant data from extracted and imported data
+# (imported columns are text, so compare them as numbers: as text '2.0' > '2')
 insert into passenger_amount
   select passenger_count as passenger, total_amount as amount
   from yellow_tripdata_2024_01
-  where passenger_count > 2 and total_amount > 0 ;
+  where cast(passenger_count as real) > 2 and cast(total_amount as real) > 0 ;
 
 # drop the imported table as we do not need it any longer
 drop table yellow_tripdata_2024_01;
@@ -0,0 +1,129 @@
+import argparse
+import csv
+import os
+import sqlite3
+import time
+
+from transform import MIN_AMOUNT, MIN_PASSENGERS, number
+
+# Settings for a one-off bulk load: the database is rebuilt from the extract
+# on every run, so there is nothing to protect with a journal or fsyncs
+BULK_PRAGMAS = [
+    'PRAGMA page_size = 65536',
+    'PRAGMA journal_mode = OFF',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA cache_size = -262144',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA locking_mode = EXCLUSIVE',
+]
+
+
+def filtered_rows(path, totals, counts):
+    # Stream matching (passengers, amount) rows and keep per-group totals
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        passenger_column = columns.index('passenger_count')
+        amount_column = columns.index('total_amount')
+        for row in reader:
+            counts['scanned'] += 1
+            if len(row) <= max(passenger_column, amount_column):
+                continue
+            passengers = number(row[passenger_column])
+            amount = number(row[amount_column])
+            if passengers is None or amount is None:
+                continue
+            if passengers > MIN_PASSENGERS and amount > MIN_AMOUNT:
+                passengers = int(passengers)
+                group = totals.setdefault(passengers, [0, 0, 0.0])
+                group[0] += 1
+                group[1] += passengers
+                group[2] += amount
+                yield passengers, amount
+
+
+def bulk_load(path, database, aggregate=True):
+    """Filter the CSV straight into passenger_amount in one transaction.
+
+    With aggregate set, the per-passenger-count totals that load.sql would
+    compute are also stored in passenger_totals. Returns the rows written
+    and the input rows processed per second.
+    """
+    if os.path.exists(database):
+        os.remove(database)
+    connection = sqlite3.connect(database, isolation_level=None)
+    for pragma in BULK_PRAGMAS:
+        connection.execute(pragma)
+
+    start = time.perf_counter()
+    totals = {}
+    counts = {'scanned': 0}
+    connection.execute('BEGIN')
+    connection.execute('create table passenger_amount (passengers int, amount float)')
+    connection.executemany('insert into passenger_amount values (?, ?)', filtered_rows(path, totals, counts))
+    if aggregate:
+        connection.execute('create table passenger_totals '
+                           '(passenger_count int primary key, rows int, passengers int, amount float)')
+        connection.executemany('insert into passenger_totals values (?, ?, ?, ?)',
+                               [(k,) + tuple(v) for k, v in sorted(totals.items())])
+    connection.execute('COMMIT')
+    connection.close()
+
+    elapsed = time.perf_counter() - start
+    rows = sum(group[0] for group in totals.values())
+    return rows, counts['scanned'] / elapsed if elapsed else 0.0
+
+
+def two_table_load(path, database):
+    """The transform.sql approach, for comparison: import every row as text
+    into a staging table, copy the matching rows, then drop the staging table.
+    Staging columns are TEXT like those .import creates, so the filter casts
+    them to numbers first, as transform.sql does; compared as text, '2.0'
+    would pass "> 2" and '10' would fail it."""
+    if os.path.exists(database):
+        os.remove(database)
+    connection = sqlite3.connect(database)
+    start = time.perf_counter()
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        column_list = ', '.join(f'"{c}" text' for c in columns)
+        connection.execute(f'create table yellow_tripdata_2024_01 ({column_list})')
+        placeholders = ', '.join('?' * len(columns))
+        scanned = [0]
+
+        def rows():
+            for row in reader:
+                scanned[0] += 1
+                if len(row) == len(columns):
+                    yield row
+        connection.executemany(f'insert into yellow_tripdata_2024_01 values ({placeholders})', rows())
+    connection.execute('create table passenger_amount (passengers int, amount float)')
+    cursor = connection.execute(
+        'insert into passenger_amount select passenger_count as passenger, total_amount as amount '
+        'from yellow_tripdata_2024_01 '
+        'where cast(passenger_count as real) > 2 and cast(total_amount as real) > 0')
+    rows = cursor.rowcount
+    connection.execute('drop table yellow_tripdata_2024_01')
+    connection.commit()
+    connection.close()
+    elapsed = time.perf_counter() - start
+    return rows, scanned[0] / elapsed if elapsed else 0.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-load the filtered taxi rows into SQLite in one pass')
+    parser.add_argument('path', nargs='?', default='/extract/yellow_tripdata_2024-01.partial.csv')
+    parser.add_argument('--database', default='/transform/transform.sqlite')
+    parser.add_argument('--no-aggregate', action='store_true')
+    parser.add_argument('--compare', action='store_true',
+                        help='also time the two-table transform.sql approach into a scratch database')
+    args = parser.parse_args()
+
+    rows, rate = bulk_load(args.path, args.database, not args.no_aggregate)
+    print(f"Bulk load: {rows} rows written, {rate:,.0f} input rows/s")
+    if args.compare:
+        scratch = args.database + '.compare'
+        rows, rate = two_table_load(args.path, scratch)
+        os.remove(scratch)
+        print(f"Two-table load: {rows} rows written, {rate:,.0f} input rows/s")
@@ -1,11 +1,3 @@
-import csv
+from outlier_detection import ThresholdDetector, run
 
-print("Outlier detection started.")
-
-with open('/data.csv') as csvfile:
-    rows = csv.reader(csvfile, delimiter=' ')
-    for r in rows:
-        if int(r[1]) > 108:
-            print("Outlier detected at timestep:", r[0],"- outlier value:",r[1])
-
-print("Outlier detection finished.")
\ No newline at end of file
+run('/data.csv', ThresholdDetector(108))
@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+
+def read_chunks(path, chunk_bytes=64 * 1024 * 1024, delimiter=None, start=0, partial=True):
+    """Yield (block, end_offset) for blocks of whole lines.
+
+    Each block is parsed to floats in one NumPy call and reshaped by column
+    count, so no per-row Python work is done (see Block). end_offset is the
+    byte offset just after the block.
+
+    Reading starts at byte offset start. With partial=False a last line
+    without a newline is left unread, since a writer may still be appending
+    to it.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        remainder = b''
+        while True:
+            block = f.read(chunk_bytes)
+            # A short read means this is the last block of the file
+            eof = len(block) < chunk_bytes
+            data = remainder + block
+            if eof and partial:
+                lines, remainder = data, b''
+            else:
+                cut = data.rfind(b'\n') + 1
+                lines, remainder = data[:cut], data[cut:]
+            offset += len(lines)
+            if lines.strip():
+                yield Block(lines, delimiter), offset
+            if eof:
+                return
+
+
+class Block:
+    """A block of "timestep value" lines parsed in one go.
+
+    values holds the value column as floats. The byte span of every line is
+    kept instead of its tokens, so outliers(flags) can report flagged rows
+    exactly as they appear in the file while only those rows are decoded.
+    """
+
+    def __init__(self, lines, delimiter=None):
+        # Fields are whitespace separated; any other delimiter is mapped to a space
+        if delimiter is not None:
+            lines = lines.replace(delimiter, b' ')
+        first_line = lines.lstrip().split(b'\n', 1)[0]
+        columns = len(first_line.split())
+        raw = np.frombuffer(lines, dtype=np.uint8)
+        newlines = np.flatnonzero(raw == ord('\n'))
+        starts = np.concatenate([[0], newlines + 1])
+        ends = np.concatenate([newlines, [len(raw)]])
+        # Blank lines (including a trailing newline) hold no row
+        filled = ends > starts
+        self.lines = lines
+        self.starts, self.ends = starts[filled], ends[filled]
+        try:
+            numbers = np.fromstring(lines, sep=' ')
+        except ValueError:
+            raise ValueError("rows are not all numeric") from None
+        if len(numbers) != len(self.starts) * columns:
+            raise ValueError(f"rows do not all have {columns} columns")
+        self.values = numbers.reshape(-1, columns)[:, 1]
+
+    def __len__(self):
+        return len(self.values)
+
+    def outliers(self, flags):
+        # Outlier report lines for the flagged rows, with the tokens as written
+        report = []
+        for start, end in zip(self.starts[flags], self.ends[flags]):
+            timestep, value = self.lines[start:end].split()[:2]
+            report.append(f"Outlier detected at timestep: {timestep.decode()} - outlier value: {value.decode()}\n")
+        return ''.join(report)
+
+
+class ThresholdDetector:
+    """Flag values above a fixed threshold."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def __call__(self, values):
+        return values > self.threshold
+
+
+class RollingZScoreDetector:
+    """Flag values more than `z` standard deviations from the mean of the
+    previous `window` values. The tail of each chunk is carried over, so the
+    window runs across chunk boundaries."""
+
+    def __init__(self, window=100, z=3.0):
+        self.window = window
+        self.z = z
+        self.history = np.empty(0)
+
+    def __call__(self, values):
+        series = np.concatenate([self.history, values])
+        offset = len(self.history)
+        self.history = series[-self.window:]
+
+        sums = np.concatenate([[0.0], np.cumsum(series)])
+        squares = np.concatenate([[0.0], np.cumsum(series * series)])
+        flags = np.zeros(len(values), dtype=bool)
+        index = np.arange(offset, len(series))
+        ready = index >= self.window
+        index = index[ready]
+        mean = (sums[index] - sums[index - self.window]) / self.window
+        variance = (squares[index] - squares[index - self.window]) / self.window - mean * mean
+        std = np.sqrt(np.maximum(variance, 0.0))
+        flags[ready] = (np.abs(series[index] - mean) > self.z * std) & (std > 0)
+        return flags
+
+
+class MADDetector:
+    """Flag values whose modified z-score (median absolute deviation) exceeds
+    `z`. The median and MAD are taken per chunk, which keeps the detector
+    single-pass and tracks slow drifts on large files."""
+
+    def __init__(self, z=3.5):
+        self.z = z
+
+    def __call__(self, values):
+        median = np.median(values)
+        mad = np.median(np.abs(values - median))
+        if mad == 0:
+            return np.zeros(len(values), dtype=bool)
+        return 0.6745 * np.abs(values - median) / mad > self.z
+
+
+class RunningStats:
+    """Streaming mean and variance (Welford), updated a whole array at a time."""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, values):
+        # Merge the batch statistics into the running ones (Chan et al.)
+        n = len(values)
+        if not n:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+
+class AdaptiveDetector:
+    """Flag values more than `z` standard deviations from the running mean of
+    everything seen so far. Each block is judged against the statistics from
+    before it, then folded in. While fewer than `warmup` values have been
+    seen, a block is folded in first and judged against statistics that
+    include itself, so the first block of a file is still checked once it
+    brings the count up to `warmup`."""
+
+    def __init__(self, z=3.0, warmup=30, stats=None):
+        self.z = z
+        self.warmup = warmup
+        self.stats = stats or RunningStats()
+
+    def __call__(self, values):
+        warming_up = self.stats.count < self.warmup
+        if warming_up:
+            self.stats.update(values)
+        if self.stats.count >= self.warmup and self.stats.std > 0:
+            flags = np.abs(values - self.stats.mean) > self.z * self.stats.std
+        else:
+            flags = np.zeros(len(values), dtype=bool)
+        if not warming_up:
+            self.stats.update(values)
+        return flags
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'offset': 0, 'stats': RunningStats().to_dict()}
+
+
+def save_checkpoint(path, checkpoint):
+    # Write to a temporary file first so a crash never leaves half a checkpoint
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temporary, path)
+
+
+def detect_new(path, checkpoint_path, detector=None, output=None,
+               chunk_bytes=64 * 1024 * 1024, delimiter=None):
+    """Process only the rows appended since the last checkpoint.
+
+    The checkpoint stores the byte offset reached and the running mean and
+    variance, so each call costs O(new data). If the file shrank it is
+    assumed to have been replaced and is read from the start again.
+    Returns the number of new rows and outliers found.
+    """
+    output = output or sys.stdout
+    checkpoint = load_checkpoint(checkpoint_path)
+    stats = RunningStats(**checkpoint['stats'])
+    if os.path.getsize(path) < checkpoint['offset']:
+        checkpoint['offset'] = 0
+        stats = RunningStats()
+    detector = detector or AdaptiveDetector()
+    if isinstance(detector, AdaptiveDetector):
+        # Resume the adaptive threshold from the checkpointed statistics
+        detector.stats = stats
+
+    rows = found = 0
+    for block, offset in read_chunks(path, chunk_bytes, delimiter,
+                                     start=checkpoint['offset'], partial=False):
+        flags = detector(block.values)
+        if not isinstance(detector, AdaptiveDetector):
+            stats.update(block.values)
+        rows += len(block)
+        if flags.any():
+            found += int(flags.sum())
+            output.write(block.outliers(flags))
+        output.flush()
+        checkpoint = {'offset': offset, 'stats': stats.to_dict()}
+        save_checkpoint(checkpoint_path, checkpoint)
+    return rows, found
+
+
+def follow(path, checkpoint_path, detector=None, interval=5.0, **options):
+    """Keep processing rows as they are appended to path, every interval seconds.
+
+    options are passed to detect_new (output, chunk_bytes, delimiter).
+    """
+    print("Outlier detection following", path)
+    detector = detector or AdaptiveDetector()
+    while True:
+        rows, found = detect_new(path, checkpoint_path, detector, **options)
+        if rows:
+            print(f"Processed {rows} new rows, {found} outliers", file=sys.stderr)
+        time.sleep(interval)
+
+
+def detect(path, detector, output=None, chunk_bytes=64 * 1024 * 1024, delimiter=None):
+    """Run detector over the file and write outlier lines in bulk.
+
+    output is a file object (stdout by default). Returns the number of
+    rows scanned and outliers found.
+    """
+    output = output or sys.stdout
+    rows = found = 0
+    for block, _ in read_chunks(path, chunk_bytes, delimiter):
+        flags = detector(block.values)
+        rows += len(block)
+        if flags.any():
+            found += int(flags.sum())
+            output.write(block.outliers(flags))
+    return rows, found
+
+
+def make_detector(name, threshold=None, window=100, z=None):
+    if name == 'threshold':
+        return ThresholdDetector(threshold)
+    if name == 'zscore':
+        return RollingZScoreDetector(window, z or 3.0)
+    if name == 'mad':
+        return MADDetector(z or 3.5)
+    if name == 'adaptive':
+        return AdaptiveDetector(z or 3.0)
+    raise ValueError(f"unknown detector {name}")
+
+
+def run(path, detector, **options):
+    print("Outlier detection started.")
+    detect(path, detector, **options)
+    sys.stdout.flush()
+    print("Outlier detection finished.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detect outliers in a "timestep value" file')
+    parser.add_argument('path', nargs='?', default='/data.csv')
+    parser.add_argument('--detector', choices=['threshold', 'zscore', 'mad', 'adaptive'], default='threshold')
+    parser.add_argument('--threshold', type=float, default=110)
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--z', type=float, default=None)
+    parser.add_argument('--output', default=None, help='write outliers here instead of stdout')
+    parser.add_argument('--follow', action='store_true',
+                        help='keep running and only process rows appended since the last checkpoint')
+    parser.add_argument('--checkpoint', default='outlier_checkpoint.json')
+    parser.add_argument('--interval', type=float, default=5.0)
+    args = parser.parse_args()
+
+    detector = make_detector(args.detector, args.threshold, args.window, args.z)
+    if args.follow:
+        if args.output:
+            # Appended to, since a restart carries on from the checkpoint
+            with open(args.output, 'a') as output:
+                follow(args.path, args.checkpoint, detector, args.interval, output=output)
+        else:
+            follow(args.path, args.checkpoint, detector, args.interval)
+    elif args.output:
+        with open(args.output, 'w') as output:
+            run(args.path, detector, output=output)
+    else:
+        run(args.path, detector)
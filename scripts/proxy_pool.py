@@ -0,0 +1,157 @@
+import json
+import os
+import random
+import threading
+
+from proxy_validator import validate_proxies
+
+
+def new_state(latency=1.0):
+    return {'success': 1.0, 'latency': latency, 'failures': 0, 'uses': 0,
+            'evicted': False, 'failed_rechecks': 0}
+
+
+class ProxyPool:
+    """Proxies with a rolling success rate and latency, picked by score.
+
+    success and latency are exponentially weighted moving averages (alpha
+    is the weight of the newest request). A proxy's score is success /
+    latency, roughly the successful requests per second it delivers, and
+    get() picks proxies at random in proportion to it. A proxy is evicted
+    after max_failures failures in a row, or when its success rate drops
+    below min_success once it has min_uses requests. Evicted proxies are
+    re-checked in the background every recheck_interval seconds and put
+    back if they work, or dropped after max_rechecks failed re-checks.
+    """
+
+    def __init__(self, path=None, alpha=0.2, max_failures=3, min_success=0.3, min_uses=5,
+                 recheck_interval=300, max_rechecks=5, **validator_options):
+        self.path = path
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.min_success = min_success
+        self.min_uses = min_uses
+        self.recheck_interval = recheck_interval
+        self.max_rechecks = max_rechecks
+        self.validator_options = validator_options
+        self.proxies = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.proxies = json.load(f)['proxies']
+
+    def save(self, path=None):
+        # Write to a temporary file first so a crash never leaves half a state file
+        path = path or self.path
+        with self.lock:
+            state = json.dumps({'proxies': self.proxies}, indent=1)
+        with open(path + '.tmp', 'w') as f:
+            f.write(state)
+        os.replace(path + '.tmp', path)
+
+    def add(self, proxy, latency=None):
+        with self.lock:
+            if proxy not in self.proxies:
+                self.proxies[proxy] = new_state()
+            state = self.proxies[proxy]
+            state.update(evicted=False, failures=0, failed_rechecks=0)
+            if latency is not None:
+                state['latency'] = latency
+
+    def add_results(self, results):
+        # Take the working proxies from validate_proxies()
+        for result in results:
+            if result.alive:
+                self.add(result.proxy, result.latency)
+
+    @staticmethod
+    def score(state):
+        return state['success'] / max(state['latency'], 0.01)
+
+    def healthy(self):
+        with self.lock:
+            return [proxy for proxy, state in self.proxies.items() if not state['evicted']]
+
+    def get(self):
+        with self.lock:
+            healthy = [(proxy, self.score(state)) for proxy, state in self.proxies.items()
+                       if not state['evicted']]
+        if not healthy:
+            raise LookupError("no healthy proxies in the pool")
+        proxies, scores = zip(*healthy)
+        return random.choices(proxies, weights=scores)[0]
+
+    def report(self, proxy, ok, latency=None):
+        """Record how a request through proxy went."""
+        with self.lock:
+            state = self.proxies.get(proxy)
+            if state is None:
+                # Dropped by a re-check while the request was in flight
+                return
+            state['uses'] += 1
+            state['success'] += self.alpha * (ok - state['success'])
+            if ok:
+                state['failures'] = 0
+                if latency is not None:
+                    state['latency'] += self.alpha * (latency - state['latency'])
+            else:
+                state['failures'] += 1
+            if (state['failures'] >= self.max_failures
+                    or (state['uses'] >= self.min_uses and state['success'] < self.min_success)):
+                state['evicted'] = True
+
+    def recheck(self):
+        """Validate the evicted proxies once and put the working ones back.
+
+        Returns the number of proxies reinstated.
+        """
+        with self.lock:
+            evicted = [proxy for proxy, state in self.proxies.items() if state['evicted']]
+        if not evicted:
+            return 0
+        results = validate_proxies(evicted, detect_ip=False, **self.validator_options)
+        reinstated = 0
+        with self.lock:
+            for result in results:
+                state = self.proxies.get(result.proxy)
+                if state is None:
+                    continue
+                if result.alive:
+                    # Start again from a neutral success rate, not a clean slate
+                    state.update(evicted=False, failures=0, uses=0, failed_rechecks=0,
+                                 success=max(state['success'], 0.5), latency=result.latency)
+                    reinstated += 1
+                else:
+                    state['failed_rechecks'] += 1
+                    if state['failed_rechecks'] >= self.max_rechecks:
+                        del self.proxies[result.proxy]
+        return reinstated
+
+    def _run(self):
+        while not self.stopped.wait(self.recheck_interval):
+            self.recheck()
+            if self.path:
+                self.save()
+
+    def start(self):
+        # Re-check evicted proxies on a background thread
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.path:
+            self.save()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
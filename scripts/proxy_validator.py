@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import json
+import ssl
+import sys
+import time
+from urllib.parse import urlsplit
+
+# httpbin echoes the caller's IP and request headers, which is what the
+# anonymity check needs. Plain http so headers added by the proxy are visible.
+JUDGE_URL = 'http://httpbin.org/get'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:80.0) Gecko/20100101 Firefox/80.0'
+# Headers that give away that a proxy sits in between
+PROXY_HEADERS = {'via', 'x-forwarded-for', 'forwarded', 'x-real-ip', 'proxy-connection', 'x-proxy-id'}
+ERRORS = (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError)
+
+
+class ProxyResult:
+    """Outcome of checking one proxy.
+
+    anonymity is 'transparent' (our IP leaks through), 'anonymous' (the
+    proxy announces itself) or 'elite', and None when the judge response
+    could not be read. latency is in seconds.
+    """
+
+    def __init__(self, proxy, alive, latency=None, anonymity=None, status=None, error=None):
+        self.proxy = proxy
+        self.alive = alive
+        self.latency = latency
+        self.anonymity = anonymity
+        self.status = status
+        self.error = error
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def split_proxy(proxy):
+    # Accepts host:port or http://host:port
+    address = proxy.split('://', 1)[-1].rstrip('/')
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+async def read_response(reader, body=True):
+    """Read one HTTP/1.x response. Returns (status, headers, body, keep_alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    version, status = lines[0].split(None, 2)[:2]
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    if not body:
+        return int(status), headers, b'', keep_alive
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        # Skip any trailers up to the final blank line
+        while (await reader.readline()) not in (b'\r\n', b''):
+            pass
+        content = b''.join(chunks)
+    elif 'content-length' in headers:
+        content = await reader.readexactly(int(headers['content-length']))
+    else:
+        content = await reader.read()
+        keep_alive = False
+    return int(status), headers, content, keep_alive
+
+
+class ProxyValidator:
+    """Check proxies concurrently on one event loop.
+
+    At most `concurrency` checks are in flight at once, each limited to
+    `timeout` seconds. Connections that the proxy keeps alive are pooled
+    per proxy, so checking the same proxy again with this validator skips
+    the TCP (and TLS tunnel) setup. At most `max_idle` are kept open, capped at a quarter of
+    `concurrency`, so idle sockets never crowd out the checks themselves.
+    """
+
+    def __init__(self, url=JUDGE_URL, concurrency=200, timeout=5.0, real_ip=None, max_idle=20):
+        self.url = urlsplit(url)
+        self.timeout = timeout
+        self.real_ip = real_ip
+        self.max_idle = min(max_idle, concurrency // 4)
+        self.idle_count = 0
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.idle = {}
+
+    @property
+    def target(self):
+        port = self.url.port or (443 if self.url.scheme == 'https' else 80)
+        return self.url.hostname, port
+
+    def request_bytes(self, absolute):
+        path = self.url.path or '/'
+        if self.url.query:
+            path += '?' + self.url.query
+        if absolute:
+            # A plain http proxy needs the full URL in the request line
+            path = f'{self.url.scheme}://{self.url.netloc}{path}'
+        return (f'GET {path} HTTP/1.1\r\nHost: {self.url.netloc}\r\nUser-Agent: {USER_AGENT}\r\n'
+                f'Accept: application/json\r\nConnection: keep-alive\r\n\r\n').encode()
+
+    async def _open(self, proxy):
+        host, port = self.target
+        if proxy is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        else:
+            reader, writer = await asyncio.open_connection(*split_proxy(proxy))
+        if self.url.scheme != 'https':
+            return reader, writer
+        try:
+            if proxy is not None:
+                writer.write(f'CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n'.encode())
+                await writer.drain()
+                status, _, _, _ = await read_response(reader, body=False)
+                if status != 200:
+                    raise ValueError(f"CONNECT refused with HTTP {status}")
+            await writer.start_tls(ssl.create_default_context(), server_hostname=host)
+        except BaseException:
+            # Includes the CancelledError from wait_for timing out mid-handshake
+            writer.close()
+            raise
+        return reader, writer
+
+    def _release(self, proxy, connection):
+        if self.idle_count >= self.max_idle:
+            connection[1].close()
+        else:
+            self.idle.setdefault(proxy, []).append(connection)
+            self.idle_count += 1
+
+    async def _request(self, proxy):
+        idle = self.idle.get(proxy)
+        reused = bool(idle)
+        if idle:
+            connection = idle.pop()
+            self.idle_count -= 1
+        else:
+            connection = await self._open(proxy)
+        reader, writer = connection
+        try:
+            writer.write(self.request_bytes(proxy is not None and self.url.scheme != 'https'))
+            await writer.drain()
+            status, _, body, keep_alive = await read_response(reader)
+        except BaseException as err:
+            writer.close()
+            if reused and isinstance(err, ERRORS):
+                # The proxy may have dropped the idle connection; try a fresh one
+                return await self._request(proxy)
+            raise
+        if keep_alive:
+            self._release(proxy, connection)
+        else:
+            writer.close()
+        return status, body
+
+    def anonymity(self, body):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        if self.real_ip and self.real_ip in body.decode(errors='replace'):
+            return 'transparent'
+        if {name.lower() for name in data.get('headers', {})} & PROXY_HEADERS:
+            return 'anonymous'
+        return 'elite'
+
+    async def find_real_ip(self):
+        # Ask the judge directly, without a proxy, what our address is
+        status, body = await asyncio.wait_for(self._request(None), self.timeout)
+        self.real_ip = json.loads(body)['origin'].split(',')[0].strip()
+        return self.real_ip
+
+    async def check(self, proxy):
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                status, body = await asyncio.wait_for(self._request(proxy), self.timeout)
+            except ERRORS as err:
+                return ProxyResult(proxy, False, error=repr(err))
+            latency = time.perf_counter() - start
+            if status != 200:
+                return ProxyResult(proxy, False, latency, status=status, error=f"HTTP {status}")
+            return ProxyResult(proxy, True, latency, self.anonymity(body), status)
+
+    async def check_all(self, proxies):
+        """Check every proxy and return the results in input order.
+
+        A fixed set of worker tasks pulls from a queue, so tens of thousands
+        of proxies do not each get a task up front.
+        """
+        proxies = list(proxies)
+        results = [None] * len(proxies)
+        queue = asyncio.Queue()
+        for item in enumerate(proxies):
+            queue.put_nowait(item)
+
+        async def worker():
+            while not queue.empty():
+                i, proxy = queue.get_nowait()
+                results[i] = await self.check(proxy)
+
+        workers = min(self.concurrency, len(proxies)) or 1
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+        self.idle_count = 0
+
+
+async def _validate(proxies, detect_ip, **options):
+    validator = ProxyValidator(**options)
+    try:
+        if detect_ip and validator.real_ip is None:
+            try:
+                await validator.find_real_ip()
+            except (ERRORS + (KeyError,)) as err:
+                print(f"Could not find our own IP, transparent proxies will pass as anonymous: {err!r}",
+                      file=sys.stderr)
+        return await validator.check_all(proxies)
+    finally:
+        validator.close()
+
+
+def validate_proxies(proxies, detect_ip=True, **options):
+    """Check proxies and return a ProxyResult for each, in order.
+
+    options are passed to ProxyValidator (url, concurrency, timeout,
+    real_ip). With detect_ip, our own address is looked up first so
+    transparent proxies can be told apart.
+    """
+    return asyncio.run(_validate(proxies, detect_ip, **options))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check a list of host:port proxies concurrently')
+    parser.add_argument('path', nargs='?', default='-', help='file with one proxy per line (- for stdin)')
+    parser.add_argument('--url', default=JUDGE_URL)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--output', default=None, help='write JSON lines here instead of stdout')
+    args = parser.parse_args()
+
+    source = sys.stdin if args.path == '-' else open(args.path)
+    proxies = [line.strip() for line in source if line.strip()]
+    start = time.perf_counter()
+    results = validate_proxies(proxies, url=args.url, concurrency=args.concurrency, timeout=args.timeout)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    for result in results:
+        output.write(json.dumps(result.to_dict()) + '\n')
+    alive = sum(result.alive for result in results)
+    print(f"{alive}/{len(results)} proxies alive, checked in {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
@@ -1,7 +1,10 @@
 import requests
 from bs4 import BeautifulSoup
-import random
 import concurrent.futures
+import time
+
+from proxy_pool import ProxyPool
+from proxy_validator import validate_proxies
 
 #get the list of free proxies
 def getProxies():
@@ -17,21 +20,40 @@ def getProxies():
             pass
     return proxies
 
-def extract(proxy):
-    #this was for when we took a list into the function, without conc futures.
-    #proxy = random.choice(proxylist)
+def extract(pool):
+    #pick a proxy weighted by its score and tell the pool how it went
+    proxy = pool.get()
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:80.0) Gecko/20100101 Firefox/80.0'}
+    start = time.perf_counter()
     try:
         #change the url to https://httpbin.org/ip that doesnt block anything
         r = requests.get('https://httpbin.org/ip', headers=headers, proxies={'http' : proxy,'https': proxy}, timeout=1)
-        print(r.json(), r.status_code)
-    except requests.ConnectionError as err:
+    except requests.RequestException as err:
+        pool.report(proxy, False)
         print(repr(err))
+    else:
+        #report once, then read the body (a bad body is printed, not reported again)
+        pool.report(proxy, r.ok, time.perf_counter() - start)
+        try:
+            print(r.json(), r.status_code)
+        except ValueError:
+            print(r.text[:100], r.status_code)
     return proxy
 
 proxylist = getProxies()
 #print(len(proxylist))
 
-#check them all with futures super quick
-with concurrent.futures.ThreadPoolExecutor() as executor:
-        executor.map(extract, proxylist)
\ No newline at end of file
+#check them all concurrently on one event loop and keep the working ones, fastest first
+results = validate_proxies(proxylist, concurrency=500, timeout=5)
+working = sorted((r for r in results if r.alive), key=lambda r: r.latency)
+print(len(working), 'of', len(proxylist), 'proxies work')
+for r in working:
+    print(r.proxy, r.anonymity, round(r.latency * 1000), 'ms')
+
+#the pool remembers scores between runs and re-checks evicted proxies in the background
+with ProxyPool('proxy_pool.json', recheck_interval=60) as pool:
+    pool.add_results(results)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+        #go through the results so an error such as the pool running out of proxies is raised here
+        for proxy in executor.map(lambda _: extract(pool), range(50)):
+            pass